@@ -1,7 +1,67 @@
 from django.contrib import admin
-from .models import Student, Course, Lesson, Enrollment
+from django.utils.html import format_html, format_html_join
+from .models import Student, Course, Lesson, Enrollment, Tag, OutgoingEmail, CourseStats
+from .analytics import lesson_funnel, refresh_course_stats
+from .pagination import EstimatedCountPaginator
+
+
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ('title', 'category', 'level', 'lesson_count')
+    list_filter = ('level',)
+    search_fields = ('title',)
+    ordering = ('title', 'id')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+
+class CourseStatsAdmin(admin.ModelAdmin):
+    # Everything here is read from the rollup tables; refresh_course_stats
+    # (or the action below) is what recomputes them.
+    list_display = ('course', 'enrollment_count', 'average_progress', 'completion_rate', 'refreshed_at', 'is_stale')
+    list_select_related = ('course',)
+    ordering = ('-enrollment_count', 'course_id')
+    search_fields = ('course__title',)
+    fields = ('course', 'enrollment_count', 'average_progress', 'completion_rate', 'refreshed_at', 'stale_at', 'funnel')
+    readonly_fields = fields
+    actions = ['refresh']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(boolean=True, description='Stale')
+    def is_stale(self, obj):
+        return obj.stale_at is not None
+
+    @admin.display(description='Lesson funnel')
+    def funnel(self, obj):
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}%</td><td>{}</td></tr>',
+            ((lesson.title, count, percent, drop) for lesson, count, percent, drop in lesson_funnel(obj.course)),
+        )
+        return format_html(
+            '<table><thead><tr><th>Lesson</th><th>Completed</th><th>Of enrolled</th>'
+            '<th>Drop-off</th></tr></thead><tbody>{}</tbody></table>', rows,
+        )
+
+    @admin.action(description='Refresh selected course stats')
+    def refresh(self, request, queryset):
+        count = refresh_course_stats(queryset.values_list('course_id', flat=True))
+        self.message_user(request, f"Refreshed {count} courses.")
+
 
 admin.site.register(Student)
-admin.site.register(Course)
+admin.site.register(Course, CourseAdmin)
 admin.site.register(Lesson)
-admin.site.register(Enrollment)
\ No newline at end of file
+admin.site.register(Enrollment)
+admin.site.register(Tag)
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
+admin.site.register(CourseStats, CourseStatsAdmin)
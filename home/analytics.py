@@ -0,0 +1,100 @@
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Course, CourseStats, Enrollment, Lesson, LessonStats, progress_percent
+
+
+def stale_course_ids():
+    # Courses marked since the last refresh, plus any that have never had
+    # a stats row.
+    return list(
+        Course.objects.filter(Q(stats__isnull=True) | Q(stats__stale_at__isnull=False))
+        .order_by('pk').values_list('pk', flat=True)
+    )
+
+
+def refresh_course_stats(course_ids=None, batch_size=200):
+    """Recompute the rollups for the given courses, or for every stale one.
+
+    Lesson completions already move the rollups incrementally (see
+    Enrollment.complete_lessons); this rebuilds, in full, the courses
+    marked stale by changes a delta cannot follow, such as enrolments and
+    lessons being added, moved or removed. Returns the number of courses
+    refreshed.
+    """
+    started = timezone.now()
+    if course_ids is None:
+        course_ids = stale_course_ids()
+    course_ids = list(course_ids)
+    Completed = Enrollment.completed_lessons.through
+
+    for start in range(0, len(course_ids), batch_size):
+        chunk = course_ids[start:start + batch_size]
+        with transaction.atomic():
+            # Locked before the totals are read, and before LessonStats as in
+            # complete_lessons: a completion either commits before the read
+            # or waits and lands its delta on top of the rebuilt row.
+            list(CourseStats.objects.select_for_update().filter(course_id__in=chunk).values_list('pk'))
+            totals = {
+                row['course']: row for row in
+                Enrollment.objects.filter(course_id__in=chunk).order_by().values('course').annotate(
+                    enrollment_count=Count('pk'),
+                    progress_sum=Sum(progress_percent()),
+                    completed_count=Count('pk', filter=Q(
+                        course__lesson_count__gt=0, completed_count__gte=F('course__lesson_count'),
+                    )),
+                )
+            }
+            completions = dict(
+                Completed.objects.filter(lesson__course_id__in=chunk).order_by()
+                .values('lesson').annotate(n=Count('pk')).values_list('lesson', 'n')
+            )
+            lessons = Lesson.objects.filter(course_id__in=chunk).values_list('pk', 'course_id')
+
+            CourseStats.objects.bulk_create(
+                [
+                    CourseStats(
+                        course_id=pk,
+                        enrollment_count=totals.get(pk, {}).get('enrollment_count', 0),
+                        progress_sum=totals.get(pk, {}).get('progress_sum') or 0,
+                        completed_count=totals.get(pk, {}).get('completed_count', 0),
+                        refreshed_at=started,
+                    )
+                    for pk in chunk
+                ],
+                update_conflicts=True,
+                unique_fields=['course'],
+                update_fields=['enrollment_count', 'progress_sum', 'completed_count', 'refreshed_at'],
+            )
+            LessonStats.objects.bulk_create(
+                [
+                    LessonStats(lesson_id=pk, course_id=course_id, completion_count=completions.get(pk, 0))
+                    for pk, course_id in lessons
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['lesson'],
+                update_fields=['course', 'completion_count'],
+            )
+            # A course marked while this ran keeps its mark for the next pass.
+            CourseStats.objects.filter(course_id__in=chunk, stale_at__lte=started).update(stale_at=None)
+    return len(course_ids)
+
+
+def lesson_funnel(course):
+    """Rows of (lesson, completions, percent of enrollments, drop from the
+    previous lesson) in lesson order, read from the rollup tables."""
+    stats = getattr(course, 'stats', None)
+    enrolled = stats.enrollment_count if stats else 0
+    rows, previous = [], enrolled
+    for lesson in course.lessons.order_by('order', 'pk').select_related('stats'):
+        count = lesson.stats.completion_count if hasattr(lesson, 'stats') else 0
+        rows.append((
+            lesson,
+            count,
+            round(count * 100 / enrolled, 1) if enrolled else 0,
+            previous - count,
+        ))
+        previous = count
+    return rows
@@ -0,0 +1,228 @@
+import json
+from functools import wraps
+
+from django.http import JsonResponse
+from django.views import csrf
+
+from .filters import CourseFilter, catalog_page
+from .metrics import query_budget
+from .models import Course, Enrollment, Lesson, as_list
+
+# Fields a client may ask for with ?fields[<type>]=a,b. Rows come straight
+# from values(), so these are column names or annotations, never
+# properties; output names that differ map to the expression to select.
+COURSE_FIELDS = ['id', 'slug', 'title', 'description', 'category', 'level', 'lesson_count', 'updated_at']
+LESSON_FIELDS = ['id', 'title', 'lesson_type', 'order', 'updated_at']
+ENROLLMENT_FIELDS = {
+    'id': 'id',
+    'course_id': 'course_id',
+    'enrolled_at': 'enrolled_at',
+    'completed_count': 'completed_count',
+    'lesson_count': 'lesson_total',
+    'progress': 'progress_percent',
+    'last_completed_at': 'last_completed_at',
+}
+MAX_PER_PAGE = 100
+MAX_BATCH = 50
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(methods=('GET',), student=False):
+    """
+    JSON errors instead of redirects: 405 for other methods, 401 when not
+    logged in, 403 without a student profile (if student is set), and
+    ApiError raised by the view becomes its status.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = JsonResponse({'error': "Method not allowed"}, status=405)
+                response['Allow'] = ', '.join(methods)
+                return response
+            if not request.user.is_authenticated:
+                return JsonResponse({'error': "Authentication required"}, status=401)
+            if student and not request.student:
+                return JsonResponse({'error': "Student profile required"}, status=403)
+            try:
+                return view_func(request, *args, **kwargs)
+            except ApiError as exc:
+                return JsonResponse({'error': str(exc)}, status=exc.status)
+        return wrapper
+    return decorator
+
+
+def csrf_failure(request, reason=''):
+    """
+    CSRF_FAILURE_VIEW: API clients get a JSON 403 saying what to send
+    instead of Django's HTML page; every other path keeps that page.
+    """
+    if request.path_info.startswith('/api/'):
+        return JsonResponse({
+            'error': f"CSRF verification failed: {reason.rstrip('.')}. Send the csrftoken cookie's value in the "
+                     "X-CSRFToken header.",
+        }, status=403)
+    return csrf.csrf_failure(request, reason)
+
+
+def sparse_fields(request, resource, allowed):
+    raw = request.GET.get(f'fields[{resource}]')
+    if raw is None:
+        return list(allowed)
+    fields = list(dict.fromkeys(f.strip() for f in raw.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown or not fields:
+        raise ApiError(f"fields[{resource}] must be a comma separated subset of: {', '.join(allowed)}")
+    return fields
+
+
+def includes(request, allowed):
+    names = {name.strip() for name in request.GET.get('include', '').split(',') if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise ApiError(f"include must be a comma separated subset of: {', '.join(allowed)}")
+    return names
+
+
+def attach_course_includes(request, rows, names, fields):
+    """
+    Trim values() course rows to fields and add the requested includes,
+    one query per include for the whole page. The rows must carry 'id'.
+    """
+    course_ids = [row['id'] for row in rows]
+    results = [{field: row[field] for field in fields} for row in rows]
+    if 'tags' in names:
+        tags = {}
+        for course_id, name in (
+            Course.tags.through.objects.filter(course_id__in=course_ids)
+            .order_by('tag__name').values_list('course_id', 'tag__name')
+        ):
+            tags.setdefault(course_id, []).append(name)
+        for course_id, result in zip(course_ids, results):
+            result['tags'] = tags.get(course_id, [])
+    if 'lessons' in names:
+        lesson_fields = sparse_fields(request, 'lessons', LESSON_FIELDS)
+        lessons = {}
+        for lesson in (
+            Lesson.objects.filter(course_id__in=course_ids)
+            .order_by('course_id', 'order', 'pk').values('course_id', *lesson_fields)
+        ):
+            lessons.setdefault(lesson.pop('course_id'), []).append(lesson)
+        for course_id, result in zip(course_ids, results):
+            result['lessons'] = lessons.get(course_id, [])
+    return results
+
+
+@query_budget(8)
+@api_view()
+def courses(request):
+    fields = sparse_fields(request, 'courses', COURSE_FIELDS)
+    names = includes(request, ['tags', 'lessons'])
+    try:
+        per_page = min(max(int(request.GET.get('per_page', 20)), 1), MAX_PER_PAGE)
+    except ValueError:
+        raise ApiError("per_page must be an integer")
+
+    course_filter = CourseFilter(request.GET, queryset=Course.objects.all())
+    if not course_filter.is_valid():
+        raise ApiError(f"Invalid filters: {', '.join(course_filter.errors)}")
+    page_obj = catalog_page(course_filter, request.GET.get('cursor'), per_page, fields)
+    rows = attach_course_includes(request, list(page_obj), names, fields)
+    return JsonResponse({
+        'results': rows,
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    })
+
+
+@query_budget(7)
+@api_view()
+def course(request, course_id):
+    fields = sparse_fields(request, 'courses', COURSE_FIELDS)
+    names = includes(request, ['tags', 'lessons'])
+    row = Course.objects.filter(pk=course_id).values(*dict.fromkeys([*fields, 'id'])).first()
+    if row is None:
+        raise ApiError("Course not found", status=404)
+    return JsonResponse(attach_course_includes(request, [row], names, fields)[0])
+
+
+@query_budget(8)
+@api_view(student=True)
+def enrollments(request):
+    fields = sparse_fields(request, 'enrollments', list(ENROLLMENT_FIELDS))
+    names = includes(request, ['course', 'completed_lessons'])
+    selected = (
+        Enrollment.objects.filter(student=request.student).with_progress()
+        .order_by('enrolled_at', 'pk')
+        .values('id', 'course_id', *dict.fromkeys(ENROLLMENT_FIELDS[field] for field in fields))
+    )
+    keys, rows = [], []
+    for row in selected:
+        keys.append((row['id'], row['course_id']))
+        rows.append({field: row[ENROLLMENT_FIELDS[field]] for field in fields})
+
+    if 'course' in names:
+        course_fields = sparse_fields(request, 'courses', COURSE_FIELDS)
+        found = {
+            course['id']: course for course in
+            Course.objects.filter(pk__in=[course_id for _, course_id in keys])
+            .values(*dict.fromkeys([*course_fields, 'id']))
+        }
+        for (_, course_id), row in zip(keys, rows):
+            row['course'] = {field: found[course_id][field] for field in course_fields}
+    if 'completed_lessons' in names:
+        completed = {}
+        for enrollment_id, lesson_id in (
+            Enrollment.completed_lessons.through.objects
+            .filter(enrollment_id__in=[pk for pk, _ in keys])
+            .order_by('lesson_id').values_list('enrollment_id', 'lesson_id')
+        ):
+            completed.setdefault(enrollment_id, []).append(lesson_id)
+        for (pk, _), row in zip(keys, rows):
+            row['completed_lessons'] = completed.get(pk, [])
+    return JsonResponse({'results': rows})
+
+
+@query_budget(10 + 6 * MAX_BATCH)
+@api_view(methods=('POST',), student=True)
+def progress(request):
+    """
+    Batch of completions, one entry per course:
+    {"updates": [{"course_id": 1, "lesson_ids": [3, 4]}, ...]}. Each
+    course is applied on its own, so one bad entry does not sink the rest.
+    """
+    try:
+        updates = json.loads(request.body)['updates']
+        updates = [(int(item['course_id']), [int(pk) for pk in as_list(item['lesson_ids'])]) for item in updates]
+    except (ValueError, TypeError, KeyError):
+        raise ApiError("Expected {\"updates\": [{\"course_id\": int, \"lesson_ids\": [int, ...]}, ...]}")
+    if len(updates) > MAX_BATCH:
+        raise ApiError(f"At most {MAX_BATCH} courses per request")
+
+    found = {
+        enrollment.course_id: enrollment for enrollment in
+        Enrollment.objects.filter(
+            student=request.student, course_id__in=[course_id for course_id, _ in updates],
+        ).select_related('course')
+    }
+    results = []
+    for course_id, lesson_ids in updates:
+        enrollment = found.get(course_id)
+        if enrollment is None:
+            results.append({'course_id': course_id, 'error': "Enrollment not found"})
+            continue
+        accepted, _ = enrollment.complete_lessons(lesson_ids)
+        results.append({
+            'course_id': course_id,
+            'accepted': accepted,
+            'rejected': sorted(set(lesson_ids) - set(accepted)),
+            'completed_count': enrollment.completed_count,
+            'lesson_count': enrollment.course.lesson_count,
+            'progress': enrollment.progress,
+        })
+    return JsonResponse({'results': results})
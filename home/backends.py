@@ -0,0 +1,24 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class StudentBackend(ModelBackend):
+    # Same as ModelBackend, but the per-request user lookup also joins the
+    # Student profile, so request.user.student never costs a second query,
+    # in sync and async requests alike.
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('student').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        try:
+            user = await UserModel._default_manager.select_related('student').aget(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
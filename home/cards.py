@@ -0,0 +1,38 @@
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+CARD_TEMPLATE = 'course_card.html'
+CARD_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def _card_key(course, words, chars):
+    # Old versions are never deleted; they stop being read and expire.
+    return f'course:{course.pk}:card:{course.updated_at.timestamp()}:{words or 0}w{chars or 0}c'
+
+
+def attach_cards(courses, words=None, chars=None):
+    """
+    Set course.card to the rendered title, badges and description for each
+    course, truncated to words or chars. The cards are the same for every
+    user, so a page costs one cache round trip; only misses are rendered,
+    with their tags fetched in a single query.
+    """
+    courses = list(courses)
+    keys = [_card_key(course, words, chars) for course in courses]
+    found = cache.get_many(keys)
+    missing = [course for key, course in zip(keys, courses) if key not in found]
+    if missing:
+        prefetch_related_objects(missing, 'tags')
+        rendered = {
+            _card_key(course, words, chars): render_to_string(
+                CARD_TEMPLATE, {'course': course, 'words': words, 'chars': chars}
+            )
+            for course in missing
+        }
+        cache.set_many(rendered, CARD_TIMEOUT)
+        found.update(rendered)
+    for key, course in zip(keys, courses):
+        course.card = mark_safe(found[key])
+    return courses
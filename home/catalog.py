@@ -0,0 +1,362 @@
+import csv
+import json
+import os
+
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .models import Course, CourseStats, Enrollment, Lesson, Tag
+from .youtube import parse_youtube_url
+
+COURSE_FIELDS = ['title', 'description', 'category', 'level']
+LESSON_FIELDS = ['title', 'description', 'lesson_type', 'video_url', 'pdf', 'order', 'video_id', 'video_start']
+CSV_COURSE_COLUMNS = ['course_slug', 'course_title', 'course_description', 'category', 'level', 'tags']
+CSV_COLUMNS = CSV_COURSE_COLUMNS + [
+    'lesson_title', 'lesson_description', 'lesson_type', 'video_url', 'pdf', 'order',
+]
+PDF_DIR = Lesson._meta.get_field('pdf').upload_to
+
+
+# bulk_update builds one CASE WHEN per field over the whole batch, which
+# gets quadratic on large batches; keep its statements small.
+BULK_UPDATE_BATCH = 100
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def snapshot(obj, fields):
+    # FieldFile compares by name, so plain values are taken for pdf.
+    return [str(getattr(obj, field) or '') for field in fields]
+
+
+def read_jsonl(stream):
+    # One course per line: {"slug", "title", ..., "tags": [...], "lessons": [...]}
+    for lineno, line in enumerate(stream, start=1):
+        if line.strip():
+            try:
+                yield lineno, json.loads(line)
+            except ValueError as exc:
+                yield lineno, CatalogError(f"invalid JSON: {exc}")
+
+
+def read_csv(stream):
+    # One lesson per row with the course columns repeated; rows of one
+    # course must be contiguous. A row without lesson_title only carries
+    # the course, and may stop before the lesson columns. A malformed row
+    # fails its whole course rather than importing it without that lesson.
+    reader = csv.DictReader(stream, restval='')
+    missing = [column for column in CSV_COURSE_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise CatalogError(f"CSV header is missing {', '.join(missing)}")
+    current = slug = None
+    for lineno, row in enumerate(reader, start=2):
+        if current is None or slug != row['course_slug']:
+            if current is not None:
+                yield current
+            slug = row['course_slug']
+            current = (lineno, {
+                'slug': row['course_slug'],
+                'title': row['course_title'],
+                'description': row['course_description'],
+                'category': row['category'],
+                'level': row['level'],
+                'tags': [t for t in row['tags'].split(';') if t.strip()],
+                'lessons': [],
+            })
+        if None in row:
+            # DictReader puts values beyond the header under the None key.
+            current = (lineno, CatalogError("more fields than the header"))
+        elif isinstance(current[1], dict) and row.get('lesson_title'):
+            current[1]['lessons'].append({
+                'title': row['lesson_title'],
+                'description': row.get('lesson_description', ''),
+                'lesson_type': row.get('lesson_type', ''),
+                'video_url': row.get('video_url', ''),
+                'pdf': row.get('pdf', ''),
+                'order': row.get('order', ''),
+            })
+    if current is not None:
+        yield current
+
+
+def clean_field(model, name, value, prefix=''):
+    # The model field's own checks (max_length, slug format, choices, URL,
+    # non-negative integers), so a bad row is reported here rather than
+    # failing the whole batch in the database.
+    try:
+        return model._meta.get_field(name).clean(value, None)
+    except ValidationError as exc:
+        raise CatalogError(f"{prefix}{name}: {' '.join(exc.messages)}")
+
+
+def check_text(value, label):
+    if value is not None and not isinstance(value, str):
+        raise CatalogError(f"{label} must be a string")
+
+
+def validate(record):
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise CatalogError("expected an object")
+    for field in ['slug', 'title', 'category', 'level']:
+        if not record.get(field):
+            raise CatalogError(f"missing {field}")
+        record[field] = clean_field(Course, field, record[field])
+    check_text(record.get('description'), "description")
+
+    tags = record.get('tags') or []
+    if not isinstance(tags, list) or not all(isinstance(name, str) for name in tags):
+        raise CatalogError("tags must be a list of strings")
+    for name in tags:
+        if len(name.strip()) > Tag._meta.get_field('name').max_length:
+            raise CatalogError(f"tag too long: {name!r}")
+    record['tags'] = [name for name in tags if name.strip()]
+
+    lessons = record.get('lessons') or []
+    if not isinstance(lessons, list) or not all(isinstance(lesson, dict) for lesson in lessons):
+        raise CatalogError("lessons must be a list of objects")
+    orders = set()
+    for position, lesson in enumerate(lessons, start=1):
+        prefix = f"lesson {position}: "
+        if not lesson.get('title'):
+            raise CatalogError(f"{prefix}missing title")
+        lesson['title'] = clean_field(Lesson, 'title', lesson['title'], prefix)
+        lesson['lesson_type'] = clean_field(Lesson, 'lesson_type', lesson.get('lesson_type'), prefix)
+        check_text(lesson.get('description'), f"{prefix}description")
+        check_text(lesson.get('pdf'), f"{prefix}pdf")
+        if lesson.get('video_url'):
+            clean_field(Lesson, 'video_url', lesson['video_url'], prefix)
+            if parse_youtube_url(lesson['video_url']) is None:
+                raise CatalogError(f"{prefix}invalid YouTube URL")
+        order = lesson.get('order')
+        lesson['order'] = position if order in (None, '') else clean_field(Lesson, 'order', order, prefix)
+        # Lessons are matched on (course, order); two with one order would
+        # both be created on the first import and collide on the next.
+        if lesson['order'] in orders:
+            raise CatalogError(f"{prefix}duplicate order {lesson['order']}")
+        orders.add(lesson['order'])
+    return record
+
+
+class CatalogImporter:
+    """
+    Upsert courses (by slug) and their lessons (by course and order) in
+    batches with bulk_create/bulk_update, one transaction per batch.
+
+    Bulk writes skip model signals, so each batch refreshes the lesson
+    counters, search vectors and cached outlines of the courses it
+    touched itself.
+    """
+
+    def __init__(self, batch_size=1000, pdf_dir=None, dry_run=False, log=None):
+        self.batch_size = batch_size
+        self.pdf_dir = pdf_dir
+        self.dry_run = dry_run
+        self.log = log or (lambda message: None)
+        self.stats = dict.fromkeys(
+            ['courses_created', 'courses_updated', 'lessons_created', 'lessons_updated', 'errors'], 0,
+        )
+
+    def run(self, records):
+        batch = []
+        for lineno, record in records:
+            try:
+                batch.append(self._check_pdfs(validate(record)))
+            except CatalogError as exc:
+                self.stats['errors'] += 1
+                self.log(f"line {lineno}: {exc}")
+                continue
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.stats
+
+    def flush(self, batch):
+        # Later lines win when a slug repeats within one batch.
+        batch = list({record['slug']: record for record in batch}.values())
+        with transaction.atomic():
+            courses = self._upsert_courses(batch)
+            self._replace_tags(batch, courses)
+            self._upsert_lessons(batch, courses)
+
+            course_ids = [course.pk for course in courses.values()]
+            touched = Course.objects.filter(pk__in=course_ids)
+            touched.recount()
+            touched.update_search_vector()
+            touched.touch()
+            Enrollment.objects.filter(course_id__in=course_ids).recount()
+            CourseStats.objects.mark_stale(course_ids)
+            if self.dry_run:
+                transaction.set_rollback(True)
+        self.log(
+            "{courses_created} courses created, {courses_updated} updated; "
+            "{lessons_created} lessons created, {lessons_updated} updated".format(**self.stats)
+        )
+
+    def _upsert_courses(self, batch):
+        existing = Course.objects.in_bulk([r['slug'] for r in batch], field_name='slug')
+        new, changed, courses = [], [], {}
+        for record in batch:
+            course = existing.get(record['slug'])
+            if course is None:
+                course = Course(slug=record['slug'])
+                new.append(course)
+            before = snapshot(course, COURSE_FIELDS)
+            for field in COURSE_FIELDS:
+                setattr(course, field, record.get(field) or '')
+            if course.pk and snapshot(course, COURSE_FIELDS) != before:
+                changed.append(course)
+            courses[course.slug] = course
+        Course.objects.bulk_create(new, batch_size=self.batch_size)
+        Course.objects.bulk_update(changed, COURSE_FIELDS, batch_size=BULK_UPDATE_BATCH)
+        self.stats['courses_created'] += len(new)
+        self.stats['courses_updated'] += len(changed)
+        return courses
+
+    def _replace_tags(self, batch, courses):
+        names = {}
+        for record in batch:
+            for name in record.get('tags') or []:
+                names.setdefault(name.strip().lower(), name.strip())
+        # Tag.save() is bypassed here, so the slug is set explicitly.
+        Tag.objects.bulk_create(
+            [Tag(name=name, slug=slug) for slug, name in names.items()], ignore_conflicts=True,
+        )
+        tags = Tag.objects.in_bulk(list(names), field_name='slug')
+
+        Through = Course.tags.through
+        Through.objects.filter(course__in=courses.values()).delete()
+        Through.objects.bulk_create([
+            Through(course_id=courses[record['slug']].pk, tag_id=tags[name.strip().lower()].pk)
+            for record in batch
+            for name in {n.strip().lower(): n for n in record.get('tags') or []}.values()
+        ], ignore_conflicts=True, batch_size=self.batch_size)
+
+    def _upsert_lessons(self, batch, courses):
+        existing = {}
+        for lesson in Lesson.objects.filter(course__in=courses.values()).order_by('pk'):
+            existing.setdefault((lesson.course_id, lesson.order), lesson)
+
+        new, changed = [], []
+        now = timezone.now()
+        for record in batch:
+            course = courses[record['slug']]
+            for data in record.get('lessons') or []:
+                lesson = existing.get((course.pk, data['order']))
+                if lesson is None:
+                    lesson = Lesson(course=course, order=data['order'])
+                    new.append(lesson)
+                before = snapshot(lesson, LESSON_FIELDS)
+                lesson.title = data['title']
+                lesson.description = data.get('description') or ''
+                lesson.lesson_type = data['lesson_type']
+                lesson.video_url = data.get('video_url') or None
+                lesson.video_id, lesson.video_start = parse_youtube_url(lesson.video_url) or ('', 0)
+                lesson.pdf = self._store_pdf(data.get('pdf')) if data.get('pdf') else None
+                if lesson.pk and snapshot(lesson, LESSON_FIELDS) != before:
+                    lesson.updated_at = now
+                    changed.append(lesson)
+        Lesson.objects.bulk_create(new, batch_size=self.batch_size)
+        Lesson.objects.bulk_update(changed, LESSON_FIELDS + ['updated_at'], batch_size=BULK_UPDATE_BATCH)
+        self.stats['lessons_created'] += len(new)
+        self.stats['lessons_updated'] += len(changed)
+
+    def _check_pdfs(self, record):
+        max_length = Lesson._meta.get_field('pdf').max_length
+        for lesson in record.get('lessons') or []:
+            if not lesson.get('pdf'):
+                continue
+            if self.pdf_dir and not os.path.isfile(os.path.join(self.pdf_dir, lesson['pdf'])):
+                raise CatalogError(f"PDF not found: {lesson['pdf']}")
+            stored = os.path.join(PDF_DIR, os.path.basename(lesson['pdf'])) if self.pdf_dir else lesson['pdf']
+            if len(stored) > max_length:
+                raise CatalogError(f"PDF name too long: {lesson['pdf']}")
+        return record
+
+    def _store_pdf(self, name):
+        # Without --pdf-dir the value is taken as an existing storage name.
+        if not self.pdf_dir:
+            return name
+        source = os.path.join(self.pdf_dir, name)
+        target = os.path.join(PDF_DIR, os.path.basename(name))
+        if self.dry_run:
+            return target
+        if default_storage.exists(target) and default_storage.size(target) == os.path.getsize(source):
+            return target
+        with open(source, 'rb') as fh:
+            return default_storage.save(target, File(fh))
+
+
+def export_pdf(field, pdf_dir):
+    # Copies the file next to the export and returns its name there.
+    name = os.path.basename(field.name)
+    target = os.path.join(pdf_dir, name)
+    if not os.path.exists(target):
+        with field.open('rb') as src, open(target, 'wb') as dst:
+            for chunk in src.chunks():
+                dst.write(chunk)
+    return name
+
+
+def export_records(queryset, chunk_size=500, pdf_dir=None):
+    lessons = Lesson.objects.order_by('order', 'pk')
+    for course in queryset.order_by('pk').prefetch_related('tags', Prefetch('lessons', lessons)).iterator(chunk_size):
+        yield {
+            'slug': course.slug,
+            'title': course.title,
+            'description': course.description,
+            'category': course.category,
+            'level': course.level,
+            'tags': [tag.name for tag in course.tags.all()],
+            'lessons': [
+                {
+                    'title': lesson.title,
+                    'description': lesson.description,
+                    'lesson_type': lesson.lesson_type,
+                    'video_url': lesson.video_url or '',
+                    'pdf': (export_pdf(lesson.pdf, pdf_dir) if pdf_dir else lesson.pdf.name) if lesson.pdf else '',
+                    'order': lesson.order,
+                }
+                for lesson in course.lessons.all()
+            ],
+        }
+
+
+def write_jsonl(records, stream):
+    for record in records:
+        stream.write(json.dumps(record) + '\n')
+
+
+def write_csv(records, stream):
+    writer = csv.DictWriter(stream, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    for record in records:
+        course = {
+            'course_slug': record['slug'],
+            'course_title': record['title'],
+            'course_description': record['description'],
+            'category': record['category'],
+            'level': record['level'],
+            'tags': ';'.join(record['tags']),
+        }
+        if not record['lessons']:
+            writer.writerow(course)
+        for lesson in record['lessons']:
+            writer.writerow({
+                **course,
+                'lesson_title': lesson['title'],
+                'lesson_description': lesson['description'],
+                'lesson_type': lesson['lesson_type'],
+                'video_url': lesson['video_url'],
+                'pdf': lesson['pdf'],
+                'order': lesson['order'],
+            })
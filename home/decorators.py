@@ -0,0 +1,70 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def student_required(view_func):
+    if iscoroutinefunction(view_func):
+        @login_required
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if not await request.astudent():
+                messages.error(request, "Your student profile is missing. Please contact admin.")
+                return redirect('index')
+            return await view_func(request, *args, **kwargs)
+        return wrapper
+
+    @login_required
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not request.student:
+            messages.error(request, "Your student profile is missing. Please contact admin.")
+            return redirect('index')
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def has_messages(request):
+    return bool(len(messages.get_messages(request)))
+
+
+def conditional_page(etag_func):
+    """
+    Answer GET/HEAD with 304 when etag_func(request, *args, **kwargs) still
+    matches If-None-Match, without running the view. Responses are private
+    and always revalidated. Pages with flash messages waiting are rendered
+    in full so the messages are shown and consumed.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if await sync_to_async(has_messages)(request):
+                    response = await view_func(request, *args, **kwargs)
+                else:
+                    # condition() would call etag_func on the event loop;
+                    # compute it in a thread and hand over the result.
+                    etag = await sync_to_async(etag_func)(request, *args, **kwargs)
+                    conditional_view = condition(etag_func=lambda *args, **kwargs: etag)(view_func)
+                    response = await conditional_view(request, *args, **kwargs)
+                patch_cache_control(response, private=True, no_cache=True)
+                return response
+            return async_wrapper
+
+        conditional_view = condition(etag_func=etag_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if has_messages(request):
+                response = view_func(request, *args, **kwargs)
+            else:
+                response = conditional_view(request, *args, **kwargs)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
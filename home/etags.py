@@ -0,0 +1,57 @@
+import hashlib
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .filters import enrollments_catalog
+from .models import Course, Enrollment
+
+# ETag functions for @conditional_page. They read counters and timestamps
+# rather than rendering anything, and mix in who is asking: the
+# session (so logging in or out changes every tag) and the CSRF cookie
+# (so a cached page never carries a stale form token).
+
+
+def _etag(request, *parts):
+    viewer = (request.session.session_key, request.COOKIES.get(settings.CSRF_COOKIE_NAME))
+    return hashlib.sha1(repr((viewer, parts)).encode()).hexdigest()
+
+
+def _outline_state(course_id):
+    # Any lesson save sets its updated_at to now, which moves the maximum;
+    # deletions show up in lesson_count.
+    return (
+        Course.objects.filter(pk=course_id)
+        .annotate(lessons_updated_at=Max('lessons__updated_at'))
+        .values_list('updated_at', 'lesson_count', 'lessons_updated_at')
+        .first()
+    )
+
+
+def lesson_list_etag(request, course_id):
+    outline = _outline_state(course_id)
+    return _etag(request, outline) if outline else None
+
+
+def lesson_detail_etag(request, course_id, lesson_id):
+    outline = _outline_state(course_id)
+    if not outline:
+        return None
+    enrollment = (
+        Enrollment.objects.filter(student=request.student, course_id=course_id)
+        .values_list('pk', 'completed_count', 'last_completed_at').first()
+    )
+    return _etag(request, outline, enrollment)
+
+
+def enrollments_page_etag(request):
+    # The query string (filters, cursor) is part of the URL the browser
+    # keys its cache on, so only the data behind it is mixed in here: the
+    # keys of the rows on this page, from the page the view then reuses,
+    # and the student's own enrollments.
+    _, page = enrollments_catalog(request)
+    rows = [(course.pk, course.updated_at) for course in page]
+    enrolled = Enrollment.objects.filter(student=request.student).aggregate(
+        count=Count('pk'), enrolled_at=Max('enrolled_at'),
+    )
+    return _etag(request, rows, page.has_next(), sorted(enrolled.items()))
@@ -1,13 +1,63 @@
 import django_filters 
-from .models import Course
+from django.db.models import Q
+from .models import Course, Tag
+from .pagination import CursorPaginator
+
+CATALOG_PER_PAGE = 6
 
 
 class CourseFilter(django_filters.FilterSet):
+    q = django_filters.CharFilter(method='filter_search', label="Search")
     title = django_filters.CharFilter(lookup_expr='icontains', label="Search Title")
     category = django_filters.CharFilter(lookup_expr='icontains')
     level = django_filters.CharFilter(lookup_expr='icontains')
-    tags = django_filters.CharFilter(lookup_expr='icontains', label="Tags")
+    tags = django_filters.CharFilter(method='filter_tags', label="Tags")
 
     class Meta:
         model = Course
-        fields = ['title', 'category', 'level', 'tags']
+        fields = ['q', 'title', 'category', 'level', 'tags']
+
+    def filter_search(self, queryset, name, value):
+        return queryset.search(value)
+
+    def filter_tags(self, queryset, name, value):
+        # Comma separated tag names, matched exactly against the indexed
+        # Tag.slug; a trailing '*' asks for a prefix match ("py*").
+        query = None
+        for term in value.split(','):
+            term = term.strip().lower()
+            if term.endswith('*') and term.rstrip('*'):
+                term_query = Q(slug__startswith=term.rstrip('*'))
+            elif term and not term.endswith('*'):
+                term_query = Q(slug=term)
+            else:
+                continue
+            query = term_query if query is None else query | term_query
+        if query is None:
+            return queryset
+        matching = Course.tags.through.objects.filter(tag__in=Tag.objects.filter(query))
+        return queryset.filter(pk__in=matching.values('course_id'))
+
+
+def catalog_page(course_filter, cursor, per_page, fields=None):
+    # Search results are walked in rank order, everything else by title;
+    # pk breaks ties so the keyset is stable. With fields the page holds
+    # values() dicts, which also carry the keyset columns for the cursors.
+    searching = course_filter.is_valid() and course_filter.form.cleaned_data.get('q')
+    ordering = '-rank' if searching else 'title'
+    queryset = course_filter.qs
+    if fields is not None:
+        queryset = queryset.values(*dict.fromkeys([*fields, 'id', ordering.lstrip('-')]))
+    return CursorPaginator(queryset, per_page, ordering).page(cursor)
+
+
+def enrollments_catalog(request):
+    # The enrollments page's filter and page, built once per request: its
+    # ETag function and the view both need them, and with a search term
+    # the page is a ranked full-text query.
+    if not hasattr(request, '_enrollments_catalog'):
+        course_filter = CourseFilter(request.GET, queryset=Course.objects.defer('search_vector'))
+        request._enrollments_catalog = (
+            course_filter, catalog_page(course_filter, request.GET.get('cursor'), CATALOG_PER_PAGE),
+        )
+    return request._enrollments_catalog
@@ -0,0 +1,64 @@
+import hashlib
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db.models import F, Q
+from PIL import Image, ImageOps
+
+from .models import Student
+
+THUMBNAIL_SIZES = (64, 200, 400)
+THUMBNAIL_DIR = 'thumbs'
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+
+def pending_students():
+    return (
+        Student.objects.exclude(Q(profile_pic='') | Q(profile_pic__isnull=True))
+        .exclude(thumbnails_source=F('profile_pic'))
+    )
+
+
+def build_thumbnails(field):
+    """
+    Write square thumbnails of an uploaded image and return their names.
+
+    Names are derived from the SHA-256 of the upload, so identical images
+    share one set of files and the URLs can be cached forever.
+    """
+    storage = field.storage
+    with field.open('rb') as fh:
+        data = fh.read()
+    digest = hashlib.sha256(data).hexdigest()
+
+    names = {
+        str(size): {fmt: f'{THUMBNAIL_DIR}/{digest[:2]}/{digest}-{size}.{fmt}' for fmt in FORMATS}
+        for size in THUMBNAIL_SIZES
+    }
+    if all(storage.exists(name) for by_fmt in names.values() for name in by_fmt.values()):
+        return names
+
+    with Image.open(BytesIO(data)) as image:
+        # Phone photos store rotation in EXIF; bake it in before resizing.
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        for size in THUMBNAIL_SIZES:
+            thumb = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            for fmt, (pil_format, options) in FORMATS.items():
+                name = names[str(size)][fmt]
+                if storage.exists(name):
+                    continue
+                out = BytesIO()
+                thumb.save(out, pil_format, **options)
+                storage.save(name, ContentFile(out.getvalue()))
+    return names
+
+
+def process_student(student):
+    names = build_thumbnails(student.profile_pic)
+    # Guard against a new upload having landed while we were working.
+    return Student.objects.filter(pk=student.pk, profile_pic=student.profile_pic.name).update(
+        thumbnails=names, thumbnails_source=student.profile_pic.name,
+    )
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+MAX_ATTEMPTS = 6
+RETRY_BASE_SECONDS = 30
+
+
+def queue_mail(subject, message, from_email, recipient_list):
+    # Call inside the same transaction as the change that triggers the
+    # mail; the row only becomes visible to the worker once both commit.
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=message,
+        from_email=from_email,
+        to=list(recipient_list),
+    )
+
+
+def send_queued_mail(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """
+    Send one batch of due messages over a single SMTP connection.
+
+    Rows are locked with SKIP LOCKED so several workers can run side by
+    side. Delivery is at-least-once: a worker killed mid-batch resends
+    the rows it had not yet recorded. Returns (sent, failed) counts.
+    """
+    sent = failed = 0
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        if not batch:
+            return sent, failed
+
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            for email in batch:
+                _record_failure(email, exc, max_attempts)
+            return 0, len(batch)
+
+        try:
+            for email in batch:
+                message = EmailMessage(
+                    email.subject, email.body, email.from_email, email.to, connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception as exc:
+                    _record_failure(email, exc, max_attempts)
+                    failed += 1
+                else:
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.attempts += 1
+                    email.last_error = ''
+                    email.save(update_fields=['status', 'sent_at', 'attempts', 'last_error'])
+                    sent += 1
+        finally:
+            connection.close()
+    return sent, failed
+
+
+def _record_failure(email, exc, max_attempts):
+    email.attempts += 1
+    email.last_error = f"{type(exc).__name__}: {exc}"
+    if email.attempts >= max_attempts:
+        email.status = 'failed'
+    else:
+        delay = RETRY_BASE_SECONDS * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import resolve
+
+from home.metrics import registry
+from home.models import Enrollment
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+def percentile(values, pct):
+    # Nearest-rank, which needs no interpolation and works for one sample.
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def endpoints(enrollment):
+    course_id = enrollment.course_id
+    lesson_id = enrollment.course.lessons.order_by('order', 'pk').values_list('pk', flat=True).first()
+    urls = {
+        'index': '/',
+        'dashboard': '/dashboard/',
+        'course': '/course/',
+        'enrollments_page': '/enrollments/',
+        'enrollments_search': '/enrollments/?q=python',
+        'course_catalog_json': '/enrollments/courses.json',
+        'course_detail': f'/course/{course_id}/',
+        'lesson_list': f'/course/{course_id}/lessons/',
+        'lesson_search': '/search/lessons/?q=lesson',
+        'user_detail': f'/user/{enrollment.student.user_id}/',
+    }
+    if lesson_id:
+        urls['lesson_detail'] = f'/course/{course_id}/lesson/{lesson_id}/'
+    return urls
+
+
+def queries_so_far(url):
+    # MetricsMiddleware counts queries for every request, from whichever
+    # thread runs them, so the registry serves both handlers.
+    with registry.lock:
+        series = registry.views.get(resolve(urlsplit(url).path).view_name)
+        return (series['queries'].sum, series['queries'].count) if series else (0, 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main views through the test client from concurrent workers and report "
+        "latency percentiles, queries per request and throughput, compared with a saved baseline. "
+        "--mode asgi sends the requests through the ASGI handler from concurrent coroutines instead, "
+        "and --mode both runs each endpoint under both handlers and compares their throughput."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help="Requests per endpoint.")
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help="Worker threads (coroutines under ASGI), each logged in as its own student.")
+        parser.add_argument('--mode', choices=['wsgi', 'asgi', 'both'], default='wsgi')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help="Only run this endpoint (repeatable).")
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON file to compare with.")
+        parser.add_argument('--save-baseline', action='store_true', help="Write this run's results as the new baseline.")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed p95 slowdown against the baseline before it counts as a regression.")
+        parser.add_argument('--fail-on-regression', action='store_true')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        # Allows the 'testserver' host and swaps in the locmem mail backend,
+        # so nothing is sent while the views run.
+        setup_test_environment()
+        try:
+            results = {}
+            if options['mode'] in ('wsgi', 'both'):
+                results['wsgi'] = self.run(options, asgi=False)
+            if options['mode'] in ('asgi', 'both'):
+                results['asgi'] = self.run(options, asgi=True)
+        finally:
+            teardown_test_environment()
+
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+        regressions = []
+        for mode, rows in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(mode.upper()))
+            previous = baseline.get('modes', {}).get(mode, {})
+            regressions += [f'{name} ({mode})' for name in self.report(rows, previous, options['tolerance'])]
+        if len(results) == 2:
+            self.compare(results['wsgi'], results['asgi'])
+
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(options['baseline']) or '.', exist_ok=True)
+            modes = baseline.get('modes', {}) if baseline.get('concurrency') == options['concurrency'] else {}
+            with open(options['baseline'], 'w') as f:
+                json.dump({
+                    'vendor': connection.vendor,
+                    'concurrency': options['concurrency'],
+                    'modes': {**modes, **results},
+                }, f, indent=2, sort_keys=True)
+            self.stdout.write(f"Saved baseline to {options['baseline']}.")
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f"Regressions in: {', '.join(regressions)}")
+
+    def run(self, options, asgi):
+        rng = random.Random(options['seed'])
+        enrollments = list(
+            Enrollment.objects.filter(course__lesson_count__gt=0)
+            .select_related('course', 'student').order_by('?')[:options['concurrency']]
+        )
+        if not enrollments:
+            raise CommandError("No enrollments with lessons to benchmark; run generate_data first.")
+        workers = []
+        for enrollment in enrollments:
+            client = AsyncClient() if asgi else Client()
+            client.force_login(User.objects.get(pk=enrollment.student.user_id))
+            workers.append((client, endpoints(enrollment)))
+
+        names = list(workers[0][1])
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - set(names)
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}. Choose from {', '.join(names)}.")
+            names = [name for name in names if name in options['endpoints']]
+
+        results = {}
+        for name in names:
+            # Spread the requests over the workers, each of which sends its
+            # share back to back from its own thread or coroutine.
+            shares = [options['requests'] // len(workers)] * len(workers)
+            for i in rng.sample(range(len(workers)), options['requests'] % len(workers)):
+                shares[i] += 1
+            jobs = [(job, count) for job, count in zip(workers, shares) if name in job[1] and count]
+            if not jobs:
+                continue
+            # One warm-up request per worker so cold caches do not skew the tail.
+            if asgi:
+                asyncio.run(self.gather(jobs, name, warm_up=True))
+            else:
+                for (client, urls), _ in jobs:
+                    client.get(urls[name])
+            before = queries_so_far(jobs[0][0][1][name])
+            started = time.perf_counter()
+            if asgi:
+                runs = asyncio.run(self.gather(jobs, name))
+            else:
+                with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+                    runs = list(pool.map(lambda args: self.worker(*args, name), jobs))
+            elapsed = time.perf_counter() - started
+            after = queries_so_far(jobs[0][0][1][name])
+            samples = [sample for run in runs for sample in run]
+            latencies = [ms for ms, _ in samples]
+            results[name] = {
+                'requests': len(samples),
+                'errors': sum(1 for _, status in samples if status >= 400),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'queries': round((after[0] - before[0]) / max(after[1] - before[1], 1), 1),
+                'rps': round(len(samples) / elapsed, 1),
+            }
+        return results
+
+    def worker(self, job, count, name):
+        client, urls = job
+        samples = []
+        try:
+            for _ in range(count):
+                started = time.perf_counter()
+                response = client.get(urls[name])
+                samples.append(((time.perf_counter() - started) * 1000, response.status_code))
+        finally:
+            # Each thread opened its own database connection.
+            connections.close_all()
+        return samples
+
+    async def gather(self, jobs, name, warm_up=False):
+        try:
+            return await asyncio.gather(*(
+                self.aworker(client, urls[name], 1 if warm_up else count) for (client, urls), count in jobs
+            ))
+        finally:
+            # The async ORM and sync views share one thread, which holds
+            # the connection.
+            await sync_to_async(connections.close_all)()
+
+    async def aworker(self, client, url, count):
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await client.get(url)
+            samples.append(((time.perf_counter() - started) * 1000, response.status_code))
+        return samples
+
+    def report(self, results, previous, tolerance):
+        regressions = []
+        self.stdout.write(
+            f"{'endpoint':<22}{'reqs':>6}{'errs':>6}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'req/s':>8}  vs baseline"
+        )
+        for name, row in results.items():
+            old = previous.get(name)
+            note = ''
+            if old:
+                change = (row['p95_ms'] - old['p95_ms']) / old['p95_ms'] if old['p95_ms'] else 0
+                note = f"p95 {change:+.0%}, queries {row['queries'] - old['queries']:+g}"
+                if change > tolerance or row['queries'] > old['queries']:
+                    regressions.append(name)
+                    note += '  REGRESSION'
+            line = (
+                f"{name:<22}{row['requests']:>6}{row['errors']:>6}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+                f"{row['p99_ms']:>9}{row['queries']:>9}{row['rps']:>8}  {note}"
+            )
+            self.stdout.write(self.style.ERROR(line) if name in regressions else line)
+        return regressions
+
+    def compare(self, wsgi, asgi):
+        self.stdout.write(self.style.MIGRATE_HEADING('ASGI vs WSGI'))
+        self.stdout.write(f"{'endpoint':<22}{'wsgi req/s':>12}{'asgi req/s':>12}{'ratio':>8}{'wsgi p95':>10}{'asgi p95':>10}")
+        for name, row in wsgi.items():
+            other = asgi.get(name)
+            if not other:
+                continue
+            ratio = other['rps'] / row['rps'] if row['rps'] else 0
+            self.stdout.write(
+                f"{name:<22}{row['rps']:>12}{other['rps']:>12}{ratio:>7.2f}x{row['p95_ms']:>10}{other['p95_ms']:>10}"
+            )
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.recommend import NEIGHBOURS_K, build_neighbours
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the most similar courses for every course and store them in the cache. "
+        "Schedule it (e.g. nightly); until it has run, dashboards fall back to popular courses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('-k', type=int, default=NEIGHBOURS_K, help="Neighbours kept per course.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        count = build_neighbours(options['k'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored neighbours for {count} courses in {time.monotonic() - started:.1f}s."
+        ))
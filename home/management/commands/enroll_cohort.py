@@ -0,0 +1,50 @@
+import io
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.models import Course, Enrollment, Student
+
+
+class Command(BaseCommand):
+    help = "Enroll a list of students into one or more courses in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File with one student per line, or - for stdin.")
+        parser.add_argument('--course', type=int, action='append', dest='courses', required=True,
+                            help="Course id to enroll into (may be given more than once).")
+        parser.add_argument('--by', choices=['username', 'id'], default='username',
+                            help="What each line of the file holds.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8') if path == '-' else open(path, encoding='utf-8')
+        except OSError as exc:
+            raise CommandError(exc)
+        with stream:
+            keys = {line.strip() for line in stream if line.strip()}
+
+        course_ids = set(Course.objects.filter(pk__in=options['courses']).values_list('pk', flat=True))
+        missing_courses = set(options['courses']) - course_ids
+        if missing_courses:
+            raise CommandError(f"Unknown course ids: {', '.join(map(str, sorted(missing_courses)))}")
+
+        field = 'user__username' if options['by'] == 'username' else 'pk'
+        if field == 'pk':
+            try:
+                keys = {int(key) for key in keys}
+            except ValueError as exc:
+                raise CommandError(exc)
+        found = dict(Student.objects.filter(**{f'{field}__in': keys}).values_list(field, 'pk'))
+        for key in sorted(keys - set(found), key=str):
+            self.stderr.write(f"Unknown student: {key}")
+
+        started = time.monotonic()
+        created, skipped = Enrollment.objects.enroll(found.values(), course_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} enrollments created, {skipped} already existed, "
+            f"{len(keys) - len(found)} unknown students in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,33 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from home.catalog import export_records, write_csv, write_jsonl
+from home.models import Course
+
+
+class Command(BaseCommand):
+    help = "Stream every course and its lessons out as JSON Lines or CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or - for stdout.")
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Courses fetched per database round trip.")
+        parser.add_argument('--pdf-dir', help="Copy lesson PDFs into this directory and reference them by name.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        if options['pdf_dir']:
+            os.makedirs(options['pdf_dir'], exist_ok=True)
+
+        records = export_records(Course.objects.all(), options['batch_size'], options['pdf_dir'])
+        writer = write_csv if fmt == 'csv' else write_jsonl
+        if path == '-':
+            writer(records, self.stdout)
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                writer(records, stream)
+            self.stderr.write(f"Wrote {path}.")
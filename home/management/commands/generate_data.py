@@ -0,0 +1,158 @@
+import random
+import time
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from home.models import Course, Enrollment, Lesson, Student, Tag
+from home.youtube import parse_youtube_url
+
+CATEGORIES = ['Programming', 'Data Science', 'Design', 'Business', 'Languages', 'Music', 'Photography', 'Marketing']
+TAG_NAMES = [
+    'Python', 'Django', 'JavaScript', 'React', 'SQL', 'PostgreSQL', 'Statistics', 'Machine Learning',
+    'Figma', 'Typography', 'Finance', 'Excel', 'Spanish', 'French', 'Guitar', 'Piano',
+    'Lightroom', 'SEO', 'Copywriting', 'Docker', 'Linux', 'Git', 'Testing', 'Security',
+]
+VIDEO_URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+class Command(BaseCommand):
+    help = "Fill the database with synthetic students, courses, lessons, enrollments and completions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=1000)
+        parser.add_argument('--courses', type=int, default=100)
+        parser.add_argument('--lessons', type=int, default=12, help="Lessons per course.")
+        parser.add_argument('--enrollments', type=float, default=3,
+                            help="Mean courses per student; popularity follows a Zipf curve.")
+        parser.add_argument('--prefix', default='synth', help="Prefix for usernames and course slugs.")
+        parser.add_argument('--password', default='benchmark', help="Password given to every generated user.")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rng = random.Random(options['seed'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+
+        with transaction.atomic():
+            courses = self.create_courses(rng, prefix, options['courses'], options['lessons'], batch_size)
+        self.stdout.write(f"Created {len(courses)} courses with {options['lessons']} lessons each.")
+
+        lessons = {}
+        for course_id, lesson_id in Lesson.objects.filter(course__in=courses).order_by('order').values_list('course_id', 'pk'):
+            lessons.setdefault(course_id, []).append(lesson_id)
+        # A few courses take most of the enrollments.
+        course_ids = [course.pk for course in courses]
+        rng.shuffle(course_ids)
+        cum_weights = list(accumulate(1 / (rank + 1) ** 1.1 for rank in range(len(course_ids))))
+
+        password = make_password(options['password'])
+        offset = User.objects.filter(username__startswith=f'{prefix}-').count()
+        total = options['students']
+        enrollment_count = completion_count = 0
+        for start in range(0, total, batch_size):
+            with transaction.atomic():
+                students = self.create_students(prefix, offset + start, min(batch_size, total - start), password, batch_size)
+                enrollments, completions = self.enroll(rng, students, course_ids, cum_weights, lessons, options['enrollments'])
+                enrollment_count += len(enrollments)
+                completion_count += completions
+            self.stdout.write(f"{min(start + batch_size, total)}/{total} students...")
+
+        with transaction.atomic():
+            touched = Course.objects.filter(pk__in=course_ids)
+            touched.recount()
+            touched.update_search_vector()
+            Enrollment.objects.filter(course_id__in=course_ids).recount()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {total} students, {len(courses)} courses, {enrollment_count} enrollments and "
+            f"{completion_count} completions in {time.monotonic() - started:.1f}s."
+        ))
+
+    def create_courses(self, rng, prefix, count, lessons_per_course, batch_size):
+        tags = [Tag.objects.get_or_create(slug=name.lower(), defaults={'name': name})[0] for name in TAG_NAMES]
+        offset = Course.objects.filter(slug__startswith=f'{prefix}-').count()
+        courses = Course.objects.bulk_create([
+            Course(
+                title=f"{rng.choice(CATEGORIES)} {n}",
+                slug=f'{prefix}-{n}',
+                description=f"Synthetic course {n} for load testing.",
+                category=rng.choice(CATEGORIES),
+                level=rng.choice(Course.LEVEL_CHOICES)[0],
+            )
+            for n in range(offset, offset + count)
+        ], batch_size=batch_size)
+
+        Course.tags.through.objects.bulk_create([
+            Course.tags.through(course_id=course.pk, tag_id=tag.pk)
+            for course in courses
+            for tag in rng.sample(tags, rng.randint(1, 4))
+        ], batch_size=batch_size)
+
+        video_id, video_start = parse_youtube_url(VIDEO_URL)
+        Lesson.objects.bulk_create([
+            Lesson(
+                course_id=course.pk,
+                title=f"Lesson {order + 1}",
+                description="Synthetic lesson.",
+                lesson_type='Video',
+                video_url=VIDEO_URL,
+                video_id=video_id,
+                video_start=video_start,
+                order=order,
+            )
+            for course in courses
+            for order in range(lessons_per_course)
+        ], batch_size=batch_size)
+        return courses
+
+    def create_students(self, prefix, offset, count, password, batch_size):
+        usernames = [f'{prefix}-{n}' for n in range(offset, offset + count)]
+        User.objects.bulk_create([
+            User(username=name, email=f'{name}@example.com', password=password, is_active=True)
+            for name in usernames
+        ], batch_size=batch_size)
+        users = User.objects.filter(username__in=usernames).values_list('pk', flat=True)
+        return Student.objects.bulk_create([Student(user_id=pk) for pk in users], batch_size=batch_size)
+
+    def enroll(self, rng, students, course_ids, cum_weights, lessons, mean):
+        now = timezone.now()
+        pairs = []
+        for student in students:
+            wanted = min(len(course_ids), max(1, round(rng.expovariate(1 / mean))))
+            for course_id in set(rng.choices(course_ids, cum_weights=cum_weights, k=wanted)):
+                pairs.append((student.pk, course_id))
+
+        enrollments = Enrollment.objects.bulk_create(
+            [Enrollment(student_id=student_id, course_id=course_id) for student_id, course_id in pairs],
+            batch_size=2000,
+        )
+        Completed = Enrollment.completed_lessons.through
+        completed, last_completed = [], []
+        for enrollment in enrollments:
+            course_lessons = lessons.get(enrollment.course_id, [])
+            # A third never start, some finish, the rest drop off lesson
+            # by lesson, which gives the funnel a realistic shape.
+            roll = rng.random()
+            if roll < 0.3 or not course_lessons:
+                continue
+            if roll < 0.45:
+                done = len(course_lessons)
+            else:
+                done = 1
+                while done < len(course_lessons) and rng.random() < 0.85:
+                    done += 1
+            completed.extend(Completed(enrollment_id=enrollment.pk, lesson_id=pk) for pk in course_lessons[:done])
+            enrollment.last_completed_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 60))
+            last_completed.append(enrollment)
+
+        Completed.objects.bulk_create(completed, batch_size=5000)
+        Enrollment.objects.bulk_update(last_completed, ['last_completed_at'], batch_size=100)
+        return enrollments, len(completed)
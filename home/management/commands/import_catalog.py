@@ -0,0 +1,48 @@
+import io
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from home.catalog import CatalogError, CatalogImporter, read_csv, read_jsonl
+
+
+class Command(BaseCommand):
+    help = "Create or update courses and lessons from a JSON Lines or CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to read, or - for stdin.")
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--pdf-dir', help="Directory the 'pdf' values are relative to; files are copied into media.")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Run every batch and roll it back, reporting what would change.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        try:
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8') if path == '-' else open(path, encoding='utf-8', newline='')
+        except OSError as exc:
+            raise CommandError(exc)
+
+        started = time.monotonic()
+        importer = CatalogImporter(
+            batch_size=options['batch_size'],
+            pdf_dir=options['pdf_dir'],
+            dry_run=options['dry_run'],
+            log=self.stdout.write,
+        )
+        with stream:
+            try:
+                stats = importer.run(read_csv(stream) if fmt == 'csv' else read_jsonl(stream))
+            except CatalogError as exc:
+                raise CommandError(exc)
+
+        prefix = "Dry run: " if options['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{stats['courses_created']} courses created, {stats['courses_updated']} updated; "
+            f"{stats['lessons_created']} lessons created, {stats['lessons_updated']} updated; "
+            f"{stats['errors']} errors in {time.monotonic() - started:.1f}s."
+        ))
@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from home.models import Lesson
+from home.pdftext import clear_removed_pdfs, extract_pages, store_pages
+
+
+class Command(BaseCommand):
+    help = "Extract text from lesson PDFs into the searchable LessonPage index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Number of extraction processes.")
+        parser.add_argument('--force', action='store_true',
+                            help="Re-extract every PDF even if its hash is unchanged.")
+        parser.add_argument('--lesson', type=int, action='append', dest='lessons',
+                            help="Only index this lesson id (may be given more than once).")
+
+    def handle(self, *args, **options):
+        cleared = clear_removed_pdfs()
+
+        lessons = Lesson.objects.exclude(pdf='').exclude(pdf__isnull=True)
+        if options['lessons']:
+            lessons = lessons.filter(pk__in=options['lessons'])
+        jobs = []
+        for lesson in lessons.only('pk', 'pdf', 'pdf_sha256').iterator():
+            try:
+                path = lesson.pdf.path
+            except NotImplementedError:
+                self.stderr.write(f"Lesson {lesson.pk}: storage has no local path, skipped.")
+                continue
+            jobs.append((lesson.pk, path, '' if options['force'] else lesson.pdf_sha256))
+
+        indexed = unchanged = failed = 0
+        # Extraction is CPU bound and runs in the pool; the database writes
+        # stay in this process.
+        with ProcessPoolExecutor(max_workers=max(options['workers'], 1)) as pool:
+            futures = {pool.submit(extract_pages, path, known): lesson_id for lesson_id, path, known in jobs}
+            for future in as_completed(futures):
+                lesson_id = futures[future]
+                try:
+                    sha256, pages = future.result()
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(f"Lesson {lesson_id}: {exc}")
+                    continue
+                if pages is None:
+                    unchanged += 1
+                    continue
+                store_pages(lesson_id, sha256, pages)
+                indexed += 1
+                self.stdout.write(f"Lesson {lesson_id}: {len(pages)} pages indexed.")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {indexed}, unchanged {unchanged}, failed {failed}, cleared {cleared}."
+        ))
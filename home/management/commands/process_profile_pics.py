@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from home.images import pending_students, process_student
+
+
+class Command(BaseCommand):
+    help = "Build hashed WebP/JPEG thumbnails for new or changed profile pictures."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling for new uploads instead of exiting when done.")
+        parser.add_argument('--interval', type=float, default=10.0)
+
+    def handle(self, *args, **options):
+        failed = set()
+        while True:
+            batch = list(pending_students().exclude(pk__in=failed).order_by('pk')[:options['batch_size']])
+            done = 0
+            for student in batch:
+                try:
+                    done += process_student(student)
+                except (OSError, ValueError, Image.DecompressionBombError) as exc:
+                    # Unreadable or non-image uploads are skipped until the
+                    # student replaces them or the worker restarts.
+                    failed.add(student.pk)
+                    self.stderr.write(f"Student {student.pk}: {exc}")
+            if done:
+                self.stdout.write(f"Processed {done} profile pictures.")
+            if len(batch) < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from home.models import Enrollment
+from home.reports import csv_lines, jsonl_lines, progress_rows
+
+
+class Command(BaseCommand):
+    help = "Stream per-student, per-course progress out as CSV or JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File to write, or - for stdout.")
+        parser.add_argument('--format', choices=['jsonl', 'csv'],
+                            help="Defaults to the file extension.")
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help="Only report this course id (may be given more than once).")
+        parser.add_argument('--batch-size', type=int, default=2000,
+                            help="Rows fetched per database round trip.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('csv' if path.endswith('.csv') else 'jsonl')
+        enrollments = Enrollment.objects.all()
+        if options['courses']:
+            enrollments = enrollments.filter(course_id__in=options['courses'])
+
+        rows = progress_rows(enrollments, options['batch_size'])
+        lines = csv_lines(rows) if fmt == 'csv' else jsonl_lines(rows)
+        if path == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+        else:
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                stream.writelines(lines)
+            self.stderr.write(f"Wrote {path}.")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from home.models import Course, CourseStats, Enrollment
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized lesson and progress counters from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, action='append', dest='courses',
+                            help="Only repair this course id (may be given more than once).")
+
+    def handle(self, *args, **options):
+        courses = Course.objects.all()
+        enrollments = Enrollment.objects.all()
+        if options['courses']:
+            courses = courses.filter(pk__in=options['courses'])
+            enrollments = enrollments.filter(course_id__in=options['courses'])
+
+        with transaction.atomic():
+            course_rows = courses.recount()
+            enrollment_rows = enrollments.recount()
+            CourseStats.objects.mark_stale(courses.values('pk'))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Recounted {course_rows} courses and {enrollment_rows} enrollments."
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.analytics import refresh_course_stats
+from home.models import Course
+
+
+class Command(BaseCommand):
+    help = "Refresh the course analytics rollups for courses that changed since the last run."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help="Rebuild every course, not just stale ones.")
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        course_ids = Course.objects.order_by('pk').values_list('pk', flat=True) if options['all'] else None
+        count = refresh_course_stats(course_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {count} courses in {time.monotonic() - started:.1f}s."
+        ))
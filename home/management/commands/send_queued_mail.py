@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from home.mail import MAX_ATTEMPTS, send_queued_mail
+
+
+class Command(BaseCommand):
+    help = "Send pending messages from the email outbox."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling the outbox instead of exiting when it is empty.")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep between polls when the outbox is empty.")
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_mail(options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(f"Sent {sent}, failed {failed}.")
+            if sent + failed < options['batch_size']:
+                # Outbox drained for now.
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
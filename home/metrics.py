@@ -0,0 +1,178 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from django.template.backends.django import DjangoTemplates
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class RequestStats:
+    """
+    Per-request counters. Queries (through record_query) and templates
+    rendered by TimedDjangoTemplates add to whichever instance is current;
+    the context variable follows the request into sync_to_async threads,
+    so async views are measured the same way.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.wall_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_recorder(connection):
+    # Installed once per connection, from the thread that opened it, as a
+    # permanent execute_wrapper; a per-request execute_wrapper() block
+    # cannot be used from async code without touching the connection
+    # outside its thread.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def query_budget(limit):
+    """
+    Declare the most queries a view may run. Over budget is logged, or
+    raised as QueryBudgetExceeded when QUERY_BUDGET_STRICT is on, which is
+    how test runs catch N+1 regressions. Apply it outermost.
+    """
+    def decorator(view_func):
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _current.get()
+        if stats is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The stock Django backend, with top-level renders timed per request."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.sum}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+class Registry:
+    """
+    Histograms per URL name, kept in process memory. Each worker reports
+    its own numbers; Prometheus sums them across scrape targets.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view, stats):
+        with self.lock:
+            series = self.views.get(view)
+            if series is None:
+                series = self.views[view] = {
+                    'duration': Histogram(DURATION_BUCKETS),
+                    'queries': Histogram(QUERY_BUCKETS),
+                    'db': 0.0,
+                    'template': 0.0,
+                }
+            series['duration'].observe(stats.wall_time)
+            series['queries'].observe(stats.queries)
+            series['db'] += stats.db_time
+            series['template'] += stats.template_time
+
+    def render(self):
+        lines = [
+            '# HELP home_request_duration_seconds Wall time per request.',
+            '# TYPE home_request_duration_seconds histogram',
+        ]
+        with self.lock:
+            views = sorted(self.views.items())
+            for view, series in views:
+                lines.extend(series['duration'].lines('home_request_duration_seconds', f'view="{view}"'))
+            lines += [
+                '# HELP home_request_queries SQL queries per request.',
+                '# TYPE home_request_queries histogram',
+            ]
+            for view, series in views:
+                lines.extend(series['queries'].lines('home_request_queries', f'view="{view}"'))
+            lines += [
+                '# HELP home_request_db_seconds_total Time spent in SQL.',
+                '# TYPE home_request_db_seconds_total counter',
+            ]
+            lines += [f'home_request_db_seconds_total{{view="{view}"}} {s["db"]}' for view, s in views]
+            lines += [
+                '# HELP home_request_template_seconds_total Time spent rendering templates.',
+                '# TYPE home_request_template_seconds_total counter',
+            ]
+            lines += [f'home_request_template_seconds_total{{view="{view}"}} {s["template"]}' for view, s in views]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
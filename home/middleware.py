@@ -0,0 +1,130 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .metrics import QueryBudgetExceeded, RequestStats, registry
+from .models import Student
+
+logger = logging.getLogger(__name__)
+
+
+def get_student(request):
+    if not hasattr(request, '_cached_student'):
+        student = None
+        if request.user.is_authenticated:
+            try:
+                student = request.user.student
+            except Student.DoesNotExist:
+                pass
+        request._cached_student = student
+    return request._cached_student
+
+
+async def aget_student(request):
+    if not hasattr(request, '_cached_student'):
+        user = await request.auser()
+        # auser() and the lazy request.user cache separately; share the
+        # result so templates rendered later do not load the user again.
+        request.user = user
+        student = None
+        if user.is_authenticated:
+            if not type(user).student.is_cached(user):
+                # StudentBackend.aget_user joins the profile; sessions that
+                # ModelBackend logged in need this one query for it.
+                user.student = await Student.objects.filter(user=user).afirst()
+            try:
+                student = user.student
+            except Student.DoesNotExist:
+                pass
+        request._cached_student = student
+    return request._cached_student
+
+
+class StudentMiddleware:
+    """
+    Sets request.student to the logged in user's Student profile, loaded
+    lazily and at most once per request. It is falsy for anonymous users
+    and for users without a profile. Async views await request.astudent()
+    instead, which shares the same cache.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.student = SimpleLazyObject(lambda: get_student(request))
+        request.astudent = lambda: aget_student(request)
+        return self.get_response(request)
+
+
+class MetricsMiddleware:
+    """
+    Counts queries and times the database, template rendering and the
+    whole request, feeds the per-view histograms served by the metrics
+    view, and logs a structured line for slow or over-budget requests.
+    Streaming bodies are produced after this returns and are not counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = stats.activate()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            RequestStats.deactivate(token)
+        return self.finish(request, response, stats, started)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = stats.activate()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            RequestStats.deactivate(token)
+        return self.finish(request, response, stats, started)
+
+    def finish(self, request, response, stats, started):
+        stats.wall_time = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        registry.observe(view, stats)
+
+        budget = getattr(match.func, 'query_budget', None) if match else None
+        over_budget = budget is not None and stats.queries > budget
+        if over_budget or stats.wall_time >= settings.SLOW_REQUEST_SECONDS:
+            logger.warning('%s request %s', 'over-budget' if over_budget else 'slow', json.dumps({
+                'view': view,
+                'path': request.path,
+                'method': request.method,
+                'status': response.status_code,
+                'queries': stats.queries,
+                'query_budget': budget,
+                'db_ms': round(stats.db_time * 1000, 1),
+                'template_ms': round(stats.template_time * 1000, 1),
+                'wall_ms': round(stats.wall_time * 1000, 1),
+            }))
+        if over_budget and settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(f"{view} ran {stats.queries} queries, budget is {budget}")
+        return response
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_counters(apps, schema_editor):
+    Course = apps.get_model('home', 'Course')
+    Lesson = apps.get_model('home', 'Lesson')
+    Enrollment = apps.get_model('home', 'Enrollment')
+    Completed = Enrollment.completed_lessons.through
+
+    lesson_total = (
+        Lesson.objects.filter(course=OuterRef('pk'))
+        .order_by().values('course')
+        .annotate(c=Count('pk')).values('c')
+    )
+    completed_total = (
+        Completed.objects.filter(enrollment=OuterRef('pk'))
+        .order_by().values('enrollment')
+        .annotate(c=Count('pk')).values('c')
+    )
+    Course.objects.update(lesson_count=Coalesce(Subquery(lesson_total), Value(0)))
+    Enrollment.objects.update(completed_count=Coalesce(Subquery(completed_total), Value(0)))
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0018_remove_lesson_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='lesson_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='enrollment',
+            name='completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
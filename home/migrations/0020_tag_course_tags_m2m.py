@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+def split_legacy_tags(apps, schema_editor):
+    Course = apps.get_model('home', 'Course')
+    Tag = apps.get_model('home', 'Tag')
+    Through = Course.tags.through
+
+    tags = {}
+    links = []
+    for course_id, legacy in Course.objects.exclude(legacy_tags='').values_list('id', 'legacy_tags').iterator():
+        seen = set()
+        for name in legacy.split(','):
+            # The legacy column allowed 200 characters, Tag.name only 50.
+            name = name.strip()[:50].strip()
+            slug = name.lower()
+            if not name or slug in seen:
+                continue
+            seen.add(slug)
+            if slug not in tags:
+                tags[slug] = Tag.objects.get_or_create(slug=slug, defaults={'name': name})[0]
+            links.append(Through(course_id=course_id, tag_id=tags[slug].pk))
+    Through.objects.bulk_create(links, batch_size=1000, ignore_conflicts=True)
+
+
+def join_tags(apps, schema_editor):
+    Course = apps.get_model('home', 'Course')
+    for course in Course.objects.prefetch_related('tags'):
+        course.legacy_tags = ','.join(tag.name for tag in course.tags.all())[:200]
+        course.save(update_fields=['legacy_tags'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0019_course_lesson_count_enrollment_completed_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('slug', models.CharField(editable=False, max_length=50, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.RenameField(
+            model_name='course',
+            old_name='tags',
+            new_name='legacy_tags',
+        ),
+        migrations.AddField(
+            model_name='course',
+            name='tags',
+            field=models.ManyToManyField(blank=True, related_name='courses', to='home.tag'),
+        ),
+        migrations.RunPython(split_legacy_tags, join_tags),
+        migrations.RemoveField(
+            model_name='course',
+            name='legacy_tags',
+        ),
+    ]
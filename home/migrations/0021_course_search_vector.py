@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+class AddPostgresIndex(migrations.AddIndex):
+    # GIN indexes only exist on PostgreSQL; SQLite test databases keep the
+    # index in migration state but skip creating it.
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def backfill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Course = apps.get_model('home', 'Course')
+    Tag = apps.get_model('home', 'Tag')
+    tag_names = (
+        Tag.objects.filter(courses=OuterRef('pk'))
+        .order_by().values('courses')
+        .annotate(names=StringAgg('name', ' ')).values('names')
+    )
+    Course.objects.update(search_vector=(
+        SearchVector('title', weight='A', config='english')
+        + SearchVector(Coalesce(Subquery(tag_names), Value(''), output_field=models.TextField()), weight='B', config='english')
+        + SearchVector('category', weight='B', config='english')
+        + SearchVector('description', weight='C', config='english')
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0020_tag_course_tags_m2m'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='course',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        AddPostgresIndex(
+            model_name='course',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='course_search_vector_gin'),
+        ),
+        AddPostgresIndex(
+            model_name='course',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='course_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+    ]
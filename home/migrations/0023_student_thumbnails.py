@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0022_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='student',
+            name='thumbnails',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='student',
+            name='thumbnails_source',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
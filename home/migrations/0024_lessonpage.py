@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 04:20
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+from home.operations import AddPostgresIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0023_student_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='pdf_sha256',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.CreateModel(
+            name='LessonPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField()),
+                ('text', models.TextField()),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('lesson', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='home.lesson')),
+            ],
+            options={
+                'unique_together': {('lesson', 'page_number')},
+            },
+        ),
+        AddPostgresIndex(
+            model_name='lessonpage',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='lessonpage_search_vector_gin'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:03
+
+from django.db import migrations, models
+
+from home.youtube import parse_youtube_url
+
+
+def backfill_video_ids(apps, schema_editor):
+    Lesson = apps.get_model('home', 'Lesson')
+    lessons = []
+    for lesson in Lesson.objects.exclude(video_url='').exclude(video_url__isnull=True).only('pk', 'video_url'):
+        parsed = parse_youtube_url(lesson.video_url)
+        if parsed:
+            lesson.video_id, lesson.video_start = parsed
+            lessons.append(lesson)
+    Lesson.objects.bulk_update(lessons, ['video_id', 'video_start'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0024_lessonpage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='video_id',
+            field=models.CharField(blank=True, editable=False, max_length=11),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='video_start',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_video_ids, migrations.RunPython.noop),
+    ]
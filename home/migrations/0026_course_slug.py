@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 05:05
+
+from django.db import migrations, models
+from django.utils.text import slugify
+
+
+def backfill_slugs(apps, schema_editor):
+    Course = apps.get_model('home', 'Course')
+    taken = set()
+    courses = []
+    for course in Course.objects.order_by('pk').only('pk', 'title'):
+        base = slugify(course.title)[:200] or 'course'
+        slug, n = base, 2
+        while slug in taken:
+            slug, n = f'{base}-{n}', n + 1
+        taken.add(slug)
+        course.slug = slug
+        courses.append(course)
+    Course.objects.bulk_update(courses, ['slug'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0025_lesson_video_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=220, null=True),
+        ),
+        migrations.RunPython(backfill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='course',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=220, unique=True),
+        ),
+    ]
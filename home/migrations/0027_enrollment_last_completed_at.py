@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0026_course_slug'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='enrollment',
+            name='last_completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0027_enrollment_last_completed_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseStats',
+            fields=[
+                ('course', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='home.course')),
+                ('enrollment_count', models.PositiveIntegerField(default=0)),
+                ('progress_sum', models.BigIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('stale_at', models.DateTimeField(blank=True, db_index=True, null=True)),
+                ('refreshed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'course stats',
+            },
+        ),
+        migrations.CreateModel(
+            name='LessonStats',
+            fields=[
+                ('lesson', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='home.lesson')),
+                ('completion_count', models.PositiveIntegerField(default=0)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lesson_stats', to='home.course')),
+            ],
+            options={
+                'verbose_name_plural': 'lesson stats',
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:47
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0030_lesson_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='enrollment',
+            name='progress',
+        ),
+    ]
@@ -1,15 +1,128 @@
-from django.db import models
+from collections.abc import Iterable, Mapping
+
+from django.db import connection, models, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
 from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from django.utils.text import slugify
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, SearchVectorField, TrigramSimilarity,
+)
+
+from .youtube import parse_youtube_url
+
+SEARCH_CONFIG = 'english'
 
 
 class Student(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     profile_pic = models.ImageField(upload_to='profiles/', null=True, blank=True)
     bio = models.TextField(null=True, blank=True)
+    # Filled in by the process_profile_pics worker: {"200": {"webp": name,
+    # "jpeg": name}, ...} for the upload named in thumbnails_source.
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False)
+    thumbnails_source = models.CharField(max_length=255, blank=True, editable=False)
 
     def __str__(self):
         return self.user.username
+
+    @property
+    def has_thumbnails(self):
+        # False until the worker has processed the current upload.
+        return bool(self.profile_pic) and bool(self.thumbnails) and self.thumbnails_source == self.profile_pic.name
+
+    def thumbnail_url(self, size, fmt='jpeg'):
+        # Falls back to the original upload until the worker has caught up.
+        if not self.profile_pic:
+            return ''
+        if self.has_thumbnails:
+            name = self.thumbnails.get(str(size), {}).get(fmt)
+            if name:
+                return self.profile_pic.storage.url(name)
+        return self.profile_pic.url
     
+class Tag(models.Model):
+    name = models.CharField(max_length=50)
+    # Lower-cased copy of name; its unique index (plus the varchar_pattern_ops
+    # index Django adds on PostgreSQL) serves exact and prefix lookups.
+    slug = models.CharField(max_length=50, unique=True, editable=False)
+
+    class Meta:
+        ordering = ['name']
+
+    def clean(self):
+        super().clean()
+        # slug is not on the form, so its unique index would otherwise only
+        # surface as an IntegrityError on save.
+        self.name = self.name.strip()
+        if Tag.objects.filter(slug=self.name.lower()).exclude(pk=self.pk).exists():
+            raise ValidationError({'name': "A tag with this name already exists."})
+
+    def save(self, *args, **kwargs):
+        self.name = self.name.strip()
+        self.slug = self.name.lower()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return self.name
+
+
+class CourseQuerySet(models.QuerySet):
+    def recount(self):
+        lesson_total = (
+            Lesson.objects.filter(course=OuterRef('pk'))
+            .order_by().values('course')
+            .annotate(c=Count('pk')).values('c')
+        )
+        return self.update(lesson_count=Coalesce(Subquery(lesson_total), Value(0)))
+
+    def touch(self):
+        # For changes that do not go through Course.save(), such as tag and
+        # lesson edits and bulk imports; moves the courses onto new card and
+        # outline cache keys.
+        return self.update(updated_at=timezone.now())
+
+    def update_search_vector(self):
+        # The tsvector column only exists to serve PostgreSQL full-text
+        # search; other backends fall back to LIKE lookups in search().
+        if connection.vendor != 'postgresql':
+            return 0
+        tag_names = (
+            Tag.objects.filter(courses=OuterRef('pk'))
+            .order_by().values('courses')
+            .annotate(names=StringAgg('name', ' ')).values('names')
+        )
+        return self.update(search_vector=(
+            SearchVector('title', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(Coalesce(Subquery(tag_names), Value(''), output_field=models.TextField()), weight='B', config=SEARCH_CONFIG)
+            + SearchVector('category', weight='B', config=SEARCH_CONFIG)
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+        ))
+
+    def search(self, text):
+        text = text.strip()
+        if not text:
+            return self
+        if connection.vendor != 'postgresql':
+            return self.filter(
+                Q(title__icontains=text) | Q(description__icontains=text)
+                | Q(category__icontains=text) | Q(tags__slug=text.lower())
+            ).distinct().annotate(rank=Value(0.0, output_field=models.FloatField()))
+        # Ranked full-text match on the GIN-indexed vector, plus the trigram
+        # '%' operator on the title (also GIN-indexed) so misspelt queries
+        # still find courses.
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        return self.filter(
+            Q(search_vector=query) | Q(title__trigram_similar=text)
+        ).annotate(
+            rank=Greatest(SearchRank(F('search_vector'), query), TrigramSimilarity('title', text)),
+        ).order_by('-rank', 'pk')
+
+
 class Course(models.Model):
     LEVEL_CHOICES = [
         ('Beginner', 'Beginner'),
@@ -18,13 +131,46 @@ class Course(models.Model):
     ]
     
     title = models.CharField(max_length=200)
+    # Natural key used by import_catalog/export_catalog; filled in from
+    # the title when left blank.
+    slug = models.SlugField(max_length=220, unique=True, blank=True)
     description = models.TextField()
     category = models.CharField(max_length=100)
     level = models.CharField(max_length=20, choices=LEVEL_CHOICES)
-    tags = models.CharField(max_length=200, blank=True, help_text="Comma separated tags, e.g., Python,Django,Frontend")
+    tags = models.ManyToManyField(Tag, blank=True, related_name='courses')
+    lesson_count = models.PositiveIntegerField(default=0, editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Also moved forward when one of the course's tags changes; part of the
+    # cache key for the rendered catalog card and of the page ETags.
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = CourseQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='course_search_vector_gin'),
+            GinIndex(fields=['title'], name='course_title_trgm', opclasses=['gin_trgm_ops']),
+        ]
     
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = unique_course_slug(self.title, exclude_pk=self.pk)
+        super().save(*args, **kwargs)
+
+
+def unique_course_slug(title, exclude_pk=None):
+    base = slugify(title)[:200] or 'course'
+    taken = set(
+        Course.objects.filter(slug__startswith=base).exclude(pk=exclude_pk).values_list('slug', flat=True)
+    )
+    slug, n = base, 2
+    while slug in taken:
+        slug, n = f'{base}-{n}', n + 1
+    return slug
+
     
 class Lesson(models.Model):
     LESSON_TYPES = [
@@ -39,20 +185,298 @@ class Lesson(models.Model):
     video_url = models.URLField(blank=True, null=True)
     pdf = models.FileField(upload_to="lesson_pdfs/", blank=True, null=True)  
     order = models.PositiveIntegerField(default=0)
+    # SHA-256 of the PDF whose text is currently in LessonPage.
+    pdf_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    # Parsed from video_url on save, so rendering never has to.
+    video_id = models.CharField(max_length=11, blank=True, editable=False)
+    video_start = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
     
 
     def __str__(self):
         return f"{self.title} ({self.course.title})"
 
+    def clean(self):
+        super().clean()
+        if self.video_url and parse_youtube_url(self.video_url) is None:
+            raise ValidationError({'video_url': "Enter a valid YouTube video URL."})
+
+    def save(self, *args, **kwargs):
+        self.video_id, self.video_start = parse_youtube_url(self.video_url) or ('', 0)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'video_url' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'video_id', 'video_start'}
+        super().save(*args, **kwargs)
+
+class LessonPageQuerySet(models.QuerySet):
+    def update_search_vector(self):
+        if connection.vendor != 'postgresql':
+            return 0
+        return self.update(search_vector=SearchVector('text', config=SEARCH_CONFIG))
+
+    def search(self, text):
+        text = text.strip()
+        if not text:
+            return self.none()
+        if connection.vendor != 'postgresql':
+            return self.filter(text__icontains=text).annotate(
+                rank=Value(0.0, output_field=models.FloatField())
+            ).order_by('lesson', 'page_number')
+        query = SearchQuery(text, search_type='websearch', config=SEARCH_CONFIG)
+        return self.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query),
+        ).order_by('-rank', 'lesson', 'page_number')
+
+
+class LessonPage(models.Model):
+    # Extracted text of one PDF page, written by the index_lesson_pdfs worker.
+    lesson = models.ForeignKey(Lesson, on_delete=models.CASCADE, related_name='pages')
+    page_number = models.PositiveIntegerField()
+    text = models.TextField()
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = LessonPageQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ('lesson', 'page_number')
+        indexes = [
+            GinIndex(fields=['search_vector'], name='lessonpage_search_vector_gin'),
+        ]
+
+    def __str__(self):
+        return f"{self.lesson.title} p.{self.page_number}"
+
+
+def progress_percent():
+    # Progress from the maintained counters on Enrollment and Course.
+    return Case(
+        When(course__lesson_count=0, then=Value(0)),
+        default=F('completed_count') * 100 / F('course__lesson_count'),
+        output_field=models.IntegerField(),
+    )
+
+
+class EnrollmentQuerySet(models.QuerySet):
+    def with_progress(self):
+        # Reads the maintained counters on Enrollment and Course, so progress
+        # for a whole page of enrollments needs no aggregate queries at all.
+        return self.annotate(
+            lesson_total=F('course__lesson_count'),
+            completed_total=F('completed_count'),
+            progress_percent=progress_percent(),
+        )
+
+    def recount(self):
+        # Recomputes completed_count from the through table in a single
+        # UPDATE; used to repair drift in the denormalized counter.
+        completed_total = Coalesce(Subquery(
+            Enrollment.completed_lessons.through.objects.filter(enrollment=OuterRef('pk'))
+            .order_by().values('enrollment')
+            .annotate(c=Count('pk')).values('c')
+        ), Value(0))
+        return self.update(completed_count=completed_total)
+
+    def enroll(self, student_ids, course_ids, batch_size=1000):
+        # Pairs that already exist are read once per batch and left out of
+        # the insert. ignore_conflicts covers a pair enrolled concurrently
+        # between that read and the insert; such a pair is still counted
+        # in created, as the insert does not report what it skipped.
+        # Returns (created, skipped).
+        student_ids = as_ids(student_ids)
+        course_ids = as_ids(course_ids)
+        created = 0
+        with transaction.atomic():
+            for start in range(0, len(student_ids), batch_size):
+                chunk = student_ids[start:start + batch_size]
+                existing = set(
+                    self.filter(student_id__in=chunk, course_id__in=course_ids).values_list('student_id', 'course_id')
+                )
+                new = [
+                    Enrollment(student_id=student_id, course_id=course_id)
+                    for student_id in chunk for course_id in course_ids
+                    if (student_id, course_id) not in existing
+                ]
+                if new:
+                    self.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
+                    created += len(new)
+            if created:
+                CourseStats.objects.mark_stale(course_ids)
+        return created, len(student_ids) * len(course_ids) - created
+
+
+def as_list(values):
+    # Shared by the views and the API for ids and names in request bodies.
+    # A string, mapping or single value raises TypeError instead of being
+    # iterated: a bare "12" would otherwise be read as the ids 1 and 2.
+    if isinstance(values, (str, bytes, Mapping)) or not isinstance(values, Iterable):
+        raise TypeError(f"expected a list, got {type(values).__name__}")
+    return list(values)
+
+
+def as_ids(values):
+    # Python callers may also pass a single id or instance.
+    if isinstance(values, (int, models.Model)):
+        values = [values]
+    return sorted({int(getattr(value, 'pk', value)) for value in as_list(values)})
+
+
+def progress_for(completed_count, lesson_count):
+    # Python twin of the progress_percent expression in with_progress().
+    return completed_count * 100 // lesson_count if lesson_count else 0
+
+
 class Enrollment(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='enrollments')
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
     enrolled_at = models.DateTimeField(auto_now_add=True)
-    progress = models.IntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0, editable=False)
+    last_completed_at = models.DateTimeField(null=True, blank=True, editable=False)
     completed_lessons = models.ManyToManyField(Lesson, blank=True)
 
+    objects = EnrollmentQuerySet.as_manager()
+
     class Meta:
         unique_together = ('student', 'course')  
 
     def __str__(self):
         return f"{self.student.user.username} -> {self.course.title}"
+
+    @property
+    def progress(self):
+        # Not stored: lesson_count changes under every enrollment of the
+        # course when a lesson is added, moved or deleted.
+        return progress_for(self.completed_count, self.course.lesson_count)
+
+    def completed_lesson_ids(self):
+        # Reads only the through table; templates test membership with the
+        # completed_in filter instead of comparing Lesson instances.
+        return frozenset(
+            Enrollment.completed_lessons.through.objects
+            .filter(enrollment_id=self.pk).values_list('lesson_id', flat=True)
+        )
+
+    async def acompleted_lesson_ids(self):
+        return frozenset([
+            lesson_id async for lesson_id in
+            Enrollment.completed_lessons.through.objects
+            .filter(enrollment_id=self.pk).values_list('lesson_id', flat=True)
+        ])
+
+    def complete_lessons(self, lesson_ids):
+        # Idempotent: the enrollment row is locked, the lessons that are not
+        # yet completed are inserted and completed_count moves up by exactly
+        # that many, so double submits cannot double count. Returns
+        # (accepted, added): the lesson ids that belong to this course, and
+        # those of them this call completed.
+        lesson_ids = as_ids(lesson_ids)
+        Completed = Enrollment.completed_lessons.through
+        with transaction.atomic():
+            completed_count, lesson_count = (
+                Enrollment.objects.select_for_update(of=('self',)).filter(pk=self.pk)
+                .values_list('completed_count', 'course__lesson_count').get()
+            )
+            lessons = list(
+                Lesson.objects.filter(course_id=self.course_id, pk__in=lesson_ids)
+                .annotate(done=Exists(Completed.objects.filter(enrollment_id=self.pk, lesson_id=OuterRef('pk'))))
+                .values_list('pk', 'done')
+            )
+            new_ids = [pk for pk, done in lessons if not done]
+            if new_ids:
+                Completed.objects.bulk_create(
+                    [Completed(enrollment_id=self.pk, lesson_id=pk) for pk in new_ids],
+                    ignore_conflicts=True,
+                )
+                self.last_completed_at = timezone.now()
+                Enrollment.objects.filter(pk=self.pk).update(
+                    completed_count=F('completed_count') + len(new_ids),
+                    last_completed_at=self.last_completed_at,
+                )
+                CourseStats.objects.filter(course_id=self.course_id).record_completions(
+                    completed_count, completed_count + len(new_ids), lesson_count,
+                )
+                LessonStats.objects.filter(lesson_id__in=new_ids).update(completion_count=F('completion_count') + 1)
+                completed_count += len(new_ids)
+            self.completed_count = completed_count
+        return [pk for pk, _ in lessons], new_ids
+
+
+class CourseStatsQuerySet(models.QuerySet):
+    def mark_stale(self, course_ids):
+        # For changes the rollups cannot follow by delta, such as enrolments
+        # and lesson edits; the refresh only recomputes courses marked since
+        # it last ran.
+        return self.filter(course_id__in=course_ids).update(stale_at=timezone.now())
+
+    def record_completions(self, before, after, lesson_count):
+        # Delta update for one enrollment going from before to after
+        # completed lessons. A course without a stats row yet is left to
+        # the refresh, which treats it as stale.
+        finished = lesson_count > 0 and before < lesson_count <= after
+        return self.update(
+            progress_sum=F('progress_sum') + progress_for(after, lesson_count) - progress_for(before, lesson_count),
+            completed_count=F('completed_count') + int(finished),
+        )
+
+
+class CourseStats(models.Model):
+    course = models.OneToOneField(Course, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    enrollment_count = models.PositiveIntegerField(default=0)
+    progress_sum = models.BigIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    stale_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CourseStatsQuerySet.as_manager()
+
+    class Meta:
+        verbose_name_plural = 'course stats'
+
+    def __str__(self):
+        return f"Stats for {self.course}"
+
+    @property
+    def average_progress(self):
+        return round(self.progress_sum / self.enrollment_count, 1) if self.enrollment_count else 0
+
+    @property
+    def completion_rate(self):
+        return round(self.completed_count * 100 / self.enrollment_count, 1) if self.enrollment_count else 0
+
+
+class LessonStats(models.Model):
+    lesson = models.OneToOneField(Lesson, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='lesson_stats')
+    completion_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'lesson stats'
+
+    def __str__(self):
+        return f"Stats for {self.lesson}"
+
+
+class OutgoingEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)} ({self.status})"
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+
+from .models import Course, Lesson
+
+OUTLINE_TIMEOUT = 60 * 60 * 24
+
+
+class LessonOutline:
+    """
+    Ordered (id, title, lesson_type, order) rows for one course, with an
+    id -> position index so prev/next lookups are O(1).
+    """
+
+    def __init__(self, lessons):
+        self.lessons = lessons
+        self.positions = {lesson['id']: i for i, lesson in enumerate(lessons)}
+
+    def __iter__(self):
+        return iter(self.lessons)
+
+    def __len__(self):
+        return len(self.lessons)
+
+    def __contains__(self, lesson_id):
+        return lesson_id in self.positions
+
+    def neighbours(self, lesson_id):
+        i = self.positions.get(lesson_id)
+        if i is None:
+            return None, None
+        prev_lesson = self.lessons[i - 1] if i > 0 else None
+        next_lesson = self.lessons[i + 1] if i + 1 < len(self.lessons) else None
+        return prev_lesson, next_lesson
+
+
+def bump_outline_version(*course_ids):
+    # Outlines are keyed on Course.updated_at, which lives in the database
+    # and only moves forward, so every worker stops reading the old copy at
+    # once. Old copies are never deleted; they expire on their own.
+    Course.objects.filter(pk__in=course_ids).touch()
+
+
+def get_outline(course):
+    key = f'course:{course.pk}:outline:{course.updated_at.timestamp()}'
+    outline = cache.get(key)
+    if outline is None:
+        outline = LessonOutline(list(
+            Lesson.objects.filter(course_id=course.pk)
+            .order_by('order', 'pk')
+            .values('id', 'title', 'lesson_type', 'order')
+        ))
+        cache.set(key, outline, OUTLINE_TIMEOUT)
+    return outline
@@ -0,0 +1,145 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Keyset pagination over (ordering field, pk).
+
+    Each page is a single indexed range scan: there is no COUNT(*) and no
+    OFFSET, so deep pages cost the same as the first one. Cursors are
+    opaque url-safe tokens holding the boundary row's key. The ordering
+    field must be non-null.
+    """
+
+    def __init__(self, queryset, per_page, ordering='pk'):
+        self.per_page = per_page
+        self.field = ordering.lstrip('-')
+        self.descending = ordering.startswith('-')
+        self.queryset = queryset
+
+    def _ordered(self, descending):
+        prefix = '-' if descending else ''
+        if self.field == 'pk':
+            return self.queryset.order_by(prefix + 'pk')
+        return self.queryset.order_by(prefix + self.field, prefix + 'pk')
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            pk = obj.get('pk', obj.get('id'))
+            return obj.get(self.field, pk), pk
+        return getattr(obj, self.field), obj.pk
+
+    def encode_cursor(self, direction, obj):
+        value, pk = self._key(obj)
+        raw = json.dumps([direction, value, pk], cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def _key_fields(self):
+        meta = self.queryset.model._meta
+        if self.field == 'pk':
+            return meta.pk, meta.pk
+        annotation = self.queryset.query.annotations.get(self.field)
+        if annotation is not None:
+            return annotation.output_field, meta.pk
+        return meta.get_field(self.field), meta.pk
+
+    def decode_cursor(self, cursor):
+        # A token that decodes but holds the wrong types would otherwise
+        # only fail once the query runs; it is treated as no cursor.
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            field, pk_field = self._key_fields()
+            value, pk = field.to_python(value), pk_field.to_python(pk)
+        except (TypeError, ValueError, ValidationError):
+            return None
+        if direction not in ('n', 'p') or value is None or pk is None:
+            return None
+        return direction, value, pk
+
+    def page(self, cursor=None):
+        position = self.decode_cursor(cursor) if cursor else None
+        backwards = position is not None and position[0] == 'p'
+        # Walking backwards flips the ordering; rows are reversed afterwards.
+        descending = self.descending != backwards
+        queryset = self._ordered(descending)
+
+        if position is not None:
+            _, value, pk = position
+            lookup = 'lt' if descending else 'gt'
+            if self.field == 'pk':
+                queryset = queryset.filter(**{f'pk__{lookup}': pk})
+            else:
+                queryset = queryset.filter(
+                    Q(**{f'{self.field}__{lookup}': value})
+                    | Q(**{self.field: value, f'pk__{lookup}': pk})
+                )
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = has_more if not backwards else True
+        has_previous = has_more if backwards else position is not None
+        return CursorPage(
+            rows,
+            self.encode_cursor('n', rows[-1]) if rows and has_next else None,
+            self.encode_cursor('p', rows[0]) if rows and has_previous else None,
+        )
+
+
+class EstimatedCountPaginator(Paginator):
+    # The admin changelist needs a count; for an unfiltered table on
+    # PostgreSQL the planner's row estimate is good enough and avoids a
+    # sequential COUNT(*) over the whole catalog.
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[self.object_list.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                        [query.model._meta.db_table],
+                    )
+                    row = cursor.fetchone()
+                if row and row[0] > 0:
+                    return row[0]
+        return super().count
@@ -0,0 +1,69 @@
+import hashlib
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Lesson, LessonPage
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extract_pages(path, known_sha256=''):
+    """
+    Return (sha256, [page texts]) for a PDF, or (sha256, None) when the
+    file is unchanged since it was last indexed.
+
+    Runs in worker processes, so it must not touch the database.
+    """
+    # pypdf is only needed by the indexing worker, not the web process.
+    from pypdf import PdfReader
+
+    sha256 = file_sha256(path)
+    if sha256 == known_sha256:
+        return sha256, None
+    reader = PdfReader(path)
+    pages = []
+    for page in reader.pages:
+        try:
+            text = page.extract_text() or ''
+        except Exception:
+            # One malformed content stream should not lose the other pages.
+            text = ''
+        # PostgreSQL text columns cannot hold NUL bytes.
+        pages.append(text.replace('\x00', ''))
+    return sha256, pages
+
+
+def store_pages(lesson_id, sha256, pages):
+    with transaction.atomic():
+        LessonPage.objects.filter(lesson_id=lesson_id).delete()
+        LessonPage.objects.bulk_create(
+            [
+                LessonPage(lesson_id=lesson_id, page_number=number, text=text)
+                for number, text in enumerate(pages, start=1)
+                if text.strip()
+            ],
+            batch_size=500,
+        )
+        LessonPage.objects.filter(lesson_id=lesson_id).update_search_vector()
+        Lesson.objects.filter(pk=lesson_id).update(pdf_sha256=sha256)
+
+
+def clear_removed_pdfs():
+    # Lessons whose PDF was removed keep no stale search text. Matched on
+    # the pages rather than pdf_sha256, which a full Lesson.save() from a
+    # stale instance may have overwritten.
+    no_pdf = Q(pdf='') | Q(pdf__isnull=True)
+    stale_ids = list(
+        LessonPage.objects.filter(lesson__in=Lesson.objects.filter(no_pdf))
+        .values_list('lesson_id', flat=True).distinct()
+    )
+    LessonPage.objects.filter(lesson_id__in=stale_ids).delete()
+    Lesson.objects.filter(no_pdf).exclude(pdf_sha256='').update(pdf_sha256='')
+    return len(stale_ids)
@@ -0,0 +1,116 @@
+import numpy as np
+from django.core.cache import cache
+from scipy import sparse
+from django.db.models import F
+
+from .models import Course
+
+NEIGHBOURS_K = 20
+# Lists stay until the next build_recommendations run replaces them; a
+# course without one simply gets the popular-course fallback.
+NEIGHBOURS_TIMEOUT = None
+
+# Tags say the most about what a course covers; category and level only
+# break ties between courses with similar tags.
+FEATURE_WEIGHTS = {'tag': 1.0, 'category': 0.5, 'level': 0.25}
+
+
+def _neighbours_key(course_id):
+    return f'course:{course_id}:neighbours'
+
+
+def course_features():
+    """
+    One L2-normalised sparse row per course over a vocabulary of tags,
+    categories and levels, so a row dot product is the cosine similarity.
+    Memory follows the number of (course, feature) pairs, not courses x
+    features. Returns (course_ids, CSR matrix).
+    """
+    courses = list(Course.objects.order_by('pk').values_list('pk', 'category', 'level'))
+    index = {pk: i for i, (pk, _, _) in enumerate(courses)}
+    vocabulary, rows, cols, values = {}, [], [], []
+
+    def add(row, kind, value):
+        rows.append(row)
+        cols.append(vocabulary.setdefault((kind, value), len(vocabulary)))
+        values.append(FEATURE_WEIGHTS[kind])
+
+    for i, (pk, category, level) in enumerate(courses):
+        if category:
+            add(i, 'category', category.strip().lower())
+        if level:
+            add(i, 'level', level)
+    for course_id, tag_id in Course.tags.through.objects.values_list('course_id', 'tag_id'):
+        add(index[course_id], 'tag', tag_id)
+
+    matrix = sparse.csr_matrix(
+        (np.array(values, dtype=np.float32), (rows, cols)), shape=(len(courses), len(vocabulary)),
+    )
+    # Duplicate (row, col) pairs are summed by the constructor.
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return [pk for pk, _, _ in courses], sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+def build_neighbours(k=NEIGHBOURS_K, block_size=1024):
+    """
+    Precompute the k most similar courses for every course and store each
+    list under its own cache key. Run offline (build_recommendations, from
+    cron) rather than in a request. Similarities are taken a block of rows
+    at a time so the dense scores stay at block_size x courses. Returns the
+    number of courses processed.
+    """
+    course_ids, matrix = course_features()
+    ids = np.array(course_ids)
+    k = min(k, len(course_ids) - 1)
+    transposed = matrix.T.tocsc()
+    neighbours = {}
+    for start in range(0, len(course_ids), block_size):
+        sims = (matrix[start:start + block_size] @ transposed).toarray()
+        rows = np.arange(sims.shape[0])
+        sims[rows, rows + start] = -1
+        if k <= 0:
+            top = np.empty((sims.shape[0], 0), dtype=int)
+        else:
+            top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        for row, cols in zip(rows, top):
+            scores = sims[row, cols]
+            order = np.argsort(-scores, kind='stable')
+            neighbours[_neighbours_key(course_ids[start + row])] = [
+                (int(pk), round(float(score), 4))
+                for pk, score in zip(ids[cols[order]], scores[order]) if score > 0
+            ]
+    cache.set_many(neighbours, NEIGHBOURS_TIMEOUT)
+    return len(neighbours)
+
+
+def recommend(course_ids, limit=3):
+    """
+    Ids of the courses most similar to everything in course_ids, excluding
+    those courses themselves. One cache round trip and never a rebuild:
+    courses without precomputed neighbours just contribute nothing.
+    """
+    course_ids = set(course_ids)
+    found = cache.get_many([_neighbours_key(pk) for pk in course_ids])
+
+    scores = {}
+    for neighbours in found.values():
+        for pk, score in neighbours:
+            if pk not in course_ids:
+                scores[pk] = scores.get(pk, 0) + score
+    return sorted(scores, key=lambda pk: (-scores[pk], pk))[:limit]
+
+
+def recommended_courses(course_ids, limit=3):
+    # Students with nothing to go on yet (or too few neighbours) are
+    # topped up with the most enrolled courses they have not taken.
+    course_ids = set(course_ids)
+    picked = recommend(course_ids, limit)
+    if len(picked) < limit:
+        picked += list(
+            Course.objects.exclude(pk__in=course_ids | set(picked))
+            .order_by(F('stats__enrollment_count').desc(nulls_last=True), 'pk')
+            .values_list('pk', flat=True)[:limit - len(picked)]
+        )
+    courses = Course.objects.in_bulk(picked)
+    return [courses[pk] for pk in picked if pk in courses]
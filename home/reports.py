@@ -0,0 +1,54 @@
+import csv
+import json
+
+from .models import Enrollment
+
+REPORT_COLUMNS = [
+    'student_id', 'username', 'email', 'course_id', 'course_title', 'enrolled_at',
+    'completed_count', 'lesson_count', 'progress_percent', 'last_completed_at',
+]
+
+
+class Echo:
+    # csv.writer only needs write(); handing back the line lets the rows be
+    # yielded straight into a streaming response.
+    def write(self, value):
+        return value
+
+
+def progress_rows(queryset=None, chunk_size=2000):
+    # values() over the counter columns: no model instances and no per-row
+    # aggregates, and iterator() keeps a server-side cursor on PostgreSQL so
+    # memory stays flat however many enrollments there are.
+    if queryset is None:
+        queryset = Enrollment.objects.all()
+    rows = (
+        queryset.with_progress()
+        .order_by('pk')
+        .values_list(
+            'student_id', 'student__user__username', 'student__user__email', 'course_id', 'course__title',
+            'enrolled_at', 'completed_count', 'lesson_total', 'progress_percent', 'last_completed_at',
+        )
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        yield dict(zip(REPORT_COLUMNS, row))
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(REPORT_COLUMNS)
+    for row in rows:
+        row['enrolled_at'] = _isoformat(row['enrolled_at'])
+        row['last_completed_at'] = _isoformat(row['last_completed_at'])
+        yield writer.writerow(row.values())
+
+
+def jsonl_lines(rows):
+    for row in rows:
+        row['enrolled_at'] = _isoformat(row['enrolled_at'])
+        row['last_completed_at'] = _isoformat(row['last_completed_at'])
+        yield json.dumps(row) + '\n'
@@ -0,0 +1,113 @@
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def file_etag(stat):
+    # Strong validator: changes whenever the file is rewritten or resized.
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header, size):
+    """
+    Return (start, end) inclusive for a single 'bytes=' range, None when
+    the header is absent or asks for several ranges (served as a full
+    200), or raise ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _iter_range(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def serve_file(request, path, relative_name, content_type, filename=None):
+    """
+    Serve a file with conditional GET and single byte-range support.
+
+    settings.SENDFILE_MODE hands the transfer to a fronting web server:
+    'x-accel-redirect' (nginx, with SENDFILE_URL_PREFIX mapped to an
+    internal location over MEDIA_ROOT) or 'x-sendfile' (Apache/lighttpd).
+    Otherwise full files go out through FileResponse, which uses the
+    server's wsgi.file_wrapper (sendfile) where available.
+    """
+    stat = os.stat(path)
+    etag = file_etag(stat)
+    # Whole seconds, as in the Last-Modified header; a float mtime is always
+    # newer than the If-Modified-Since a client echoes back.
+    mtime = int(stat.st_mtime)
+    last_modified = http_date(mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if not_modified is not None:
+        return not_modified
+
+    mode = getattr(settings, 'SENDFILE_MODE', None)
+    if mode == 'x-accel-redirect':
+        response = HttpResponse(content_type=content_type)
+        prefix = getattr(settings, 'SENDFILE_URL_PREFIX', '/protected/')
+        response['X-Accel-Redirect'] = quote(prefix.rstrip('/') + '/' + relative_name.lstrip('/'))
+    elif mode == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        byte_range = None
+        if_range = request.headers.get('If-Range')
+        if if_range is None or if_range == etag or if_range == last_modified:
+            try:
+                byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{stat.st_size}'
+                return response
+
+        if byte_range is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+        else:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(
+                _iter_range(path, start, length), status=206, content_type=content_type,
+            )
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            response['Content-Length'] = str(length)
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = last_modified
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    if filename:
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+    return response
@@ -0,0 +1,142 @@
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .metrics import install_query_recorder
+from .models import Course, CourseStats, Enrollment, Lesson, Tag
+from .outline import bump_outline_version
+
+
+def decrement(queryset, field):
+    # Counters are PositiveIntegerFields; one that has already drifted to
+    # zero stays there instead of failing the CHECK constraint.
+    queryset.filter(**{f'{field}__gt': 0}).update(**{field: F(field) - 1})
+
+
+@receiver(post_save, sender=Lesson)
+def lesson_added(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_course_id = instance.__dict__.pop('_previous_course_id', None)
+    if created or previous_course_id is not None:
+        Course.objects.filter(pk=instance.course_id).update(lesson_count=F('lesson_count') + 1)
+    if previous_course_id is not None:
+        decrement(Course.objects.filter(pk=previous_course_id), 'lesson_count')
+        # Completions of the lesson belong to the old course's enrollments,
+        # which no longer contain it.
+        decrement(Enrollment.objects.filter(course_id=previous_course_id, completed_lessons=instance), 'completed_count')
+        Enrollment.completed_lessons.through.objects.filter(lesson=instance).exclude(
+            enrollment__course_id=instance.course_id,
+        ).delete()
+        CourseStats.objects.mark_stale([previous_course_id])
+
+
+@receiver(pre_save, sender=Lesson)
+def lesson_moving(sender, instance, raw=False, **kwargs):
+    # A lesson moved to another course changes both outlines and both
+    # lesson counts.
+    if instance.pk and not raw:
+        old_course_id = Lesson.objects.filter(pk=instance.pk).values_list('course_id', flat=True).first()
+        if old_course_id is not None and old_course_id != instance.course_id:
+            instance._previous_course_id = old_course_id
+            bump_outline_version(old_course_id)
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_outline_changed(sender, instance, **kwargs):
+    bump_outline_version(instance.course_id)
+    CourseStats.objects.mark_stale([instance.course_id])
+
+
+@receiver(pre_delete, sender=Lesson)
+def lesson_deleted(sender, instance, **kwargs):
+    # Runs before the through rows are cascaded away, so the enrollments
+    # that had this lesson completed can still be found.
+    decrement(Course.objects.filter(pk=instance.course_id), 'lesson_count')
+    decrement(Enrollment.objects.filter(completed_lessons=instance), 'completed_count')
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        CourseStats.objects.mark_stale([instance.course_id])
+
+
+@receiver(m2m_changed, sender=Enrollment.completed_lessons.through)
+def completed_lessons_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('post_'):
+        CourseStats.objects.mark_stale([instance.course_id])
+    if reverse:
+        # instance is a Lesson and pk_set holds Enrollment ids.
+        if action == 'post_add' and pk_set:
+            Enrollment.objects.filter(pk__in=pk_set).update(
+                completed_count=F('completed_count') + 1, last_completed_at=timezone.now(),
+            )
+        elif action == 'post_remove' and pk_set:
+            Enrollment.objects.filter(pk__in=pk_set).recount()
+        elif action == 'pre_clear':
+            decrement(Enrollment.objects.filter(completed_lessons=instance), 'completed_count')
+    else:
+        # Django only reports the ids that were actually inserted on post_add.
+        if action == 'post_add' and pk_set:
+            Enrollment.objects.filter(pk=instance.pk).update(
+                completed_count=F('completed_count') + len(pk_set), last_completed_at=timezone.now(),
+            )
+        elif action in ('post_remove', 'post_clear'):
+            Enrollment.objects.filter(pk=instance.pk).recount()
+
+
+def courses_changed(courses):
+    # Both the search document and the cached catalog card are built from
+    # the course row and its tag names.
+    courses.update_search_vector()
+    courses.touch()
+
+
+@receiver(post_save, sender=Course)
+def course_saved(sender, instance, raw=False, **kwargs):
+    # save() already moved updated_at forward.
+    if not raw:
+        Course.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        courses_changed(Course.objects.filter(tags=instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    # The through rows go with the tag without an m2m_changed signal.
+    instance._deleted_course_ids = list(instance.courses.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    courses_changed(Course.objects.filter(pk__in=instance.__dict__.pop('_deleted_course_ids', [])))
+
+
+@receiver(m2m_changed, sender=Course.tags.through)
+def course_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # tag.courses.clear() does not report which courses lost the tag.
+        instance._cleared_course_ids = list(instance.courses.values_list('pk', flat=True))
+    elif reverse and action == 'post_clear':
+        courses_changed(Course.objects.filter(pk__in=instance.__dict__.pop('_cleared_course_ids', [])))
+    elif action in ('post_add', 'post_remove'):
+        if not reverse:
+            courses_changed(Course.objects.filter(pk=instance.pk))
+        elif pk_set:
+            courses_changed(Course.objects.filter(pk__in=pk_set))
+    elif action == 'post_clear':
+        courses_changed(Course.objects.filter(pk=instance.pk))
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_query_recorder(connection)
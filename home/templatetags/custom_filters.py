@@ -1,9 +1,30 @@
 from django import template
 
+from home.images import THUMBNAIL_SIZES
+
 register = template.Library()
 
 @register.filter
-def split(value, key):
-    if not value:
-        return []
-    return [v.strip() for v in value.split(key)]
\ No newline at end of file
+def completed_in(lesson, completed_ids):
+    # Works for Lesson instances and for outline rows (dicts).
+    if not completed_ids:
+        return False
+    lesson_id = lesson['id'] if isinstance(lesson, dict) else lesson.pk
+    return lesson_id in completed_ids
+
+
+@register.inclusion_tag('profile_picture.html')
+def profile_picture(student, size, css_class=''):
+    # {% profile_picture student 200 "rounded-circle" %}. The WebP source is
+    # only offered once thumbnails exist; before that the <img> points at
+    # the original upload, whatever its type.
+    size = int(size)
+    retina = min((s for s in THUMBNAIL_SIZES if s >= size * 2), default=THUMBNAIL_SIZES[-1])
+    context = {'student': student, 'size': size, 'css_class': css_class, 'src': student.thumbnail_url(size)}
+    if student.has_thumbnails:
+        context.update(
+            src_2x=student.thumbnail_url(retina),
+            webp=student.thumbnail_url(size, 'webp'),
+            webp_2x=student.thumbnail_url(retina, 'webp'),
+        )
+    return context
@@ -1,25 +1,47 @@
 from django import template
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-import re
+
+from home.youtube import parse_youtube_url
 
 register = template.Library()
 
-@register.filter
-def youtube_embed(url):
-    
-    video_id = None
+IFRAME = (
+    '<iframe width="100%" height="500" src="https://www.youtube.com/embed/{}{}" '
+    'title="YouTube video player" frameborder="0" '
+    'allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share" '
+    'referrerpolicy="strict-origin-when-cross-origin" allowfullscreen loading="lazy"></iframe>'
+)
+LITE = (
+    '<div class="yt-lite" data-video-id="{}" data-start="{}" role="button" tabindex="0" '
+    'aria-label="Play video" style="background-image: url(\'https://i.ytimg.com/vi/{}/hqdefault.jpg\');">'
+    '<span class="yt-lite-play" aria-hidden="true">&#9654;</span></div>'
+)
+
 
-    match = re.search(r'v=([a-zA-Z0-9_-]{11})', url)
-    if match:
-        video_id = match.group(1)
-    else:
-        match = re.search(r'youtu\.be/([a-zA-Z0-9_-]{11})', url)
-        if match:
-            video_id = match.group(1)
+def _video(value):
+    # Lessons carry the id parsed on save; plain URLs go through the
+    # memoized parser.
+    if hasattr(value, 'video_id'):
+        return (value.video_id, value.video_start) if value.video_id else None
+    return parse_youtube_url(value)
 
-    if video_id:
-        embed_code = f'<iframe width="100%" height="500" src="https://www.youtube.com/embed/{video_id}" title="YouTube video player" frameborder="0" allow="accelerometer; autoplay; clipboard-write; encrypted-media; gyroscope; picture-in-picture; web-share" referrerpolicy="strict-origin-when-cross-origin" allowfullscreen></iframe>'
-        return mark_safe(embed_code)
 
-    return mark_safe('<p>Invalid YouTube URL</p>')
+@register.filter
+def youtube_embed(value):
+    video = _video(value)
+    if not video:
+        return mark_safe('<p>Invalid YouTube URL</p>')
+    video_id, start = video
+    return format_html(IFRAME, video_id, f'?start={start}' if start else '')
+
 
+@register.filter
+def youtube_lite(value):
+    # Thumbnail only; lesson_detail.html swaps in the iframe on click, so
+    # the YouTube player is not loaded on every page view.
+    video = _video(value)
+    if not video:
+        return mark_safe('<p>Invalid YouTube URL</p>')
+    video_id, start = video
+    return format_html(LITE, video_id, start, video_id)
@@ -1,3 +1,506 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .catalog import CatalogError, CatalogImporter, read_csv, read_jsonl
+from .analytics import refresh_course_stats
+from .mail import queue_mail, send_queued_mail
+from .models import Course, CourseStats, Enrollment, Lesson, LessonStats, OutgoingEmail, Student, Tag
+from .pagination import CursorPaginator
+from .sendfile import serve_file
+from .youtube import parse_youtube_url
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class HomeTestCase(TestCase):
+    # Keeps the tests, and the cache.clear() below, off the shared Redis
+    # cache configured in settings.
+    pass
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryCountTests(HomeTestCase):
+    # Exact per-view query counts, so an N+1 shows up as a failing test
+    # well before it reaches the @query_budget ceiling.
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('alice', 'alice@example.com', 'pw')
+        cls.student = Student.objects.create(user=user)
+        for i in range(5):
+            course = Course.objects.create(title=f'Course {i}', description='Learn Python',
+                                           category='Programming', level='Beginner')
+            for j in range(4):
+                Lesson.objects.create(course=course, title=f'Lesson {j}', lesson_type='Video',
+                                      video_url='https://youtu.be/dQw4w9WgXcQ', order=j)
+            Enrollment.objects.create(student=cls.student, course=course)
+        cls.course = Course.objects.order_by('pk').first()
+        cls.lesson = cls.course.lessons.order_by('order').first()
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.student.user)
+
+    def assertQueries(self, num, url):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_dashboard(self):
+        self.assertQueries(5, reverse('dashboard'))
+
+    def test_course_detail(self):
+        self.assertQueries(5, reverse('course_detail', args=[self.course.pk]))
+
+    def test_enrollments_page(self):
+        # The ETag and the page share one catalog query.
+        self.assertQueries(6, reverse('enrollments_page'))
+
+    def test_enrollments_page_not_modified(self):
+        # The first response sets the CSRF cookie, which is part of the tag.
+        self.client.get(reverse('enrollments_page'))
+        etag = self.client.get(reverse('enrollments_page'))['ETag']
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('enrollments_page'), headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_lesson_detail(self):
+        self.assertQueries(9, reverse('lesson_detail', args=[self.course.pk, self.lesson.pk]))
+
+    def test_async_views_under_asgi(self):
+        # The same counts through the ASGI handler, where the views run
+        # natively and the student comes from request.astudent().
+        self.async_client.force_login(self.student.user)
+        for num, url in [
+            (5, reverse('dashboard')),
+            (6, reverse('enrollments_page')),
+            (9, reverse('lesson_detail', args=[self.course.pk, self.lesson.pk])),
+        ]:
+            with self.assertNumQueries(num):
+                response = async_to_sync(self.async_client.get)(url)
+            self.assertEqual(response.status_code, 200, url)
+
+    def test_async_student_for_model_backend_session(self):
+        # Sessions from before StudentBackend load the profile separately.
+        self.async_client.force_login(self.student.user, backend='django.contrib.auth.backends.ModelBackend')
+        with self.assertNumQueries(6):
+            response = async_to_sync(self.async_client.get)(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['student'], self.student)
+
+
+class CounterTests(HomeTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('bob', 'bob@example.com', 'pw')
+        cls.student = Student.objects.create(user=user)
+        cls.course = Course.objects.create(title='Django', description='Web apps',
+                                           category='Programming', level='Beginner')
+        cls.other = Course.objects.create(title='Flask', description='Web apps',
+                                          category='Programming', level='Beginner')
+        cls.lessons = [
+            Lesson.objects.create(course=cls.course, title=f'Lesson {i}', lesson_type='Video', order=i)
+            for i in range(3)
+        ]
+        cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def refresh(self):
+        return Enrollment.objects.select_related('course').get(pk=self.enrollment.pk)
+
+    def test_moving_a_lesson_drops_its_completions(self):
+        self.enrollment.complete_lessons([self.lessons[0].pk])
+        lesson = self.lessons[0]
+        lesson.course = self.other
+        lesson.save()
+
+        enrollment = self.refresh()
+        self.assertEqual(enrollment.completed_count, 0)
+        self.assertEqual(enrollment.completed_lesson_ids(), frozenset())
+        self.assertEqual(enrollment.course.lesson_count, 2)
+        self.assertEqual(enrollment.progress, 0)
+        self.assertEqual(Course.objects.get(pk=self.other.pk).lesson_count, 1)
+
+    def test_progress_follows_new_lessons(self):
+        self.enrollment.complete_lessons([self.lessons[0].pk])
+        self.assertEqual(self.refresh().progress, 33)
+        Lesson.objects.create(course=self.course, title='Lesson 3', lesson_type='Video', order=3)
+        self.assertEqual(self.refresh().progress, 25)
+        self.lessons[1].delete()
+        self.assertEqual(self.refresh().progress, 33)
+
+    def test_completions_update_rollups_incrementally(self):
+        Enrollment.objects.create(student=Student.objects.create(
+            user=User.objects.create_user('eve', 'eve@example.com', 'pw')), course=self.course)
+        refresh_course_stats()
+        self.enrollment.complete_lessons([lesson.pk for lesson in self.lessons[:2]])
+        self.enrollment.complete_lessons([self.lessons[2].pk])
+
+        stats = CourseStats.objects.get(pk=self.course.pk)
+        self.assertIsNone(stats.stale_at)
+        counts = dict(LessonStats.objects.filter(course=self.course).values_list('lesson', 'completion_count'))
+        self.assertEqual((stats.progress_sum, stats.completed_count), (100, 1))
+        self.assertEqual(counts, {lesson.pk: 1 for lesson in self.lessons})
+
+        refresh_course_stats([self.course.pk])
+        stats.refresh_from_db()
+        self.assertEqual((stats.progress_sum, stats.completed_count), (100, 1))
+        self.assertEqual(stats.average_progress, 50)
+
+    def test_completed_lessons_m2m_keeps_count(self):
+        self.enrollment.completed_lessons.add(*self.lessons[:2])
+        self.assertEqual(self.refresh().completed_count, 2)
+        self.enrollment.completed_lessons.remove(self.lessons[0])
+        self.assertEqual(self.refresh().completed_count, 1)
+        self.lessons[1].delete()
+        self.assertEqual(self.refresh().completed_count, 0)
+
+
+class CompletionTests(HomeTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('carol', 'carol@example.com', 'pw')
+        cls.student = Student.objects.create(user=user)
+        cls.course = Course.objects.create(title='SQL', description='Queries',
+                                           category='Data', level='Beginner')
+        cls.other = Course.objects.create(title='Go', description='Services',
+                                          category='Programming', level='Beginner')
+        cls.lessons = [
+            Lesson.objects.create(course=cls.course, title=f'Lesson {i}', lesson_type='Video', order=i)
+            for i in range(2)
+        ]
+        cls.foreign = Lesson.objects.create(course=cls.other, title='Elsewhere', lesson_type='Video')
+        cls.enrollment = Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        self.client.force_login(self.student.user)
+
+    def test_complete_lessons_is_idempotent(self):
+        pk = self.lessons[0].pk
+        self.assertEqual(self.enrollment.complete_lessons([pk, self.foreign.pk]), ([pk], [pk]))
+        self.assertEqual(self.enrollment.complete_lessons(pk), ([pk], []))
+        self.assertEqual(self.enrollment.completed_count, 1)
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollment.pk).completed_count, 1)
+
+    def test_double_submit_reports_already_completed(self):
+        url = reverse('complete_lesson', args=[self.course.pk, self.lessons[0].pk])
+        self.client.post(url)
+        response = self.client.post(url)
+        self.assertEqual([m.level_tag for m in get_messages(response.wsgi_request)], ['success', 'info'])
+        self.assertEqual(Enrollment.objects.get(pk=self.enrollment.pk).completed_count, 1)
+
+    def test_complete_lessons_view_rejects_scalars(self):
+        url = reverse('complete_lessons', args=[self.course.pk])
+        for lesson_ids in [str(self.lessons[0].pk) * 2, self.lessons[0].pk, {'id': 1}]:
+            response = self.client.post(url, json.dumps({'lesson_ids': lesson_ids}), content_type='application/json')
+            self.assertEqual(response.status_code, 400, lesson_ids)
+
+    def test_complete_lessons_view(self):
+        response = self.client.post(
+            reverse('complete_lessons', args=[self.course.pk]),
+            json.dumps({'lesson_ids': [self.lessons[0].pk, self.foreign.pk]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['accepted'], [self.lessons[0].pk])
+        self.assertEqual(response.json()['rejected'], [self.foreign.pk])
+        self.assertEqual(response.json()['progress'], 50)
+
+
+class ApiTests(HomeTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('dave', 'dave@example.com', 'pw')
+        cls.student = Student.objects.create(user=user)
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='Basics',
+                                  category='Programming', level='Beginner')
+            for i in range(3)
+        ]
+        cls.lesson = Lesson.objects.create(course=cls.courses[0], title='Intro', lesson_type='Video')
+        Enrollment.objects.create(student=cls.student, course=cls.courses[0])
+
+    def setUp(self):
+        self.client.force_login(self.student.user)
+
+    def test_courses_sparse_fields_and_cursor(self):
+        response = self.client.get(reverse('api_courses'), {'fields[courses]': 'id,title', 'per_page': 2})
+        body = response.json()
+        self.assertEqual(body['results'], [{'id': c.pk, 'title': c.title} for c in self.courses[:2]])
+        response = self.client.get(reverse('api_courses'), {'fields[courses]': 'id', 'cursor': body['next']})
+        self.assertEqual(response.json()['results'], [{'id': self.courses[2].pk}])
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('api_courses'), {'fields[courses]': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_login_required(self):
+        self.assertEqual(Client().get(reverse('api_enrollments')).status_code, 401)
+
+    def test_progress_applies_each_course(self):
+        response = self.client.post(reverse('api_progress'), json.dumps({'updates': [
+            {'course_id': self.courses[0].pk, 'lesson_ids': [self.lesson.pk]},
+            {'course_id': self.courses[1].pk, 'lesson_ids': [self.lesson.pk]},
+        ]}), content_type='application/json')
+        first, second = response.json()['results']
+        self.assertEqual(first['accepted'], [self.lesson.pk])
+        self.assertEqual(first['progress'], 100)
+        self.assertEqual(second['error'], "Enrollment not found")
+
+    def test_progress_rejects_scalar_lesson_ids(self):
+        response = self.client.post(reverse('api_progress'), json.dumps({'updates': [
+            {'course_id': self.courses[0].pk, 'lesson_ids': "12"},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_csrf_failure_is_json(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.student.user)
+        response = client.post(reverse('api_progress'), '{}', content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertIn('X-CSRFToken', response.json()['error'])
+
+
+class CursorPaginatorTests(HomeTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(5):
+            # Two courses share each title so the pk tie-break is exercised.
+            Course.objects.create(title=f'Course {i // 2}', description='-', category='-', level='Beginner')
+
+    def test_walks_forward_and_back(self):
+        paginator = CursorPaginator(Course.objects.all(), 2, 'title')
+        expected = list(Course.objects.order_by('title', 'pk'))
+        pages, page = [], paginator.page()
+        while True:
+            pages.append(list(page))
+            if not page.has_next():
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual([c for p in pages for c in p], expected)
+        self.assertEqual(list(paginator.page(page.previous_cursor)), pages[-2])
+
+    def test_bad_cursor_is_first_page(self):
+        paginator = CursorPaginator(Course.objects.all(), 2)
+        first = list(paginator.page())
+        for cursor in ['garbage', 'WyJuIiwgIngiLCAieCJd', 'WyJ4IiwgMSwgMV0']:
+            self.assertEqual(list(paginator.page(cursor)), first)
+
+
+class YoutubeTests(SimpleTestCase):
+
+    def test_parse(self):
+        cases = {
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ': ('dQw4w9WgXcQ', 0),
+            'https://youtu.be/dQw4w9WgXcQ?t=1m30s': ('dQw4w9WgXcQ', 90),
+            'https://www.youtube.com/embed/dQw4w9WgXcQ?start=42': ('dQw4w9WgXcQ', 42),
+            'https://youtube.com/shorts/dQw4w9WgXcQ': ('dQw4w9WgXcQ', 0),
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ#t=1h2m3s': ('dQw4w9WgXcQ', 3723),
+            'https://www.youtube.com/watch?v=short': None,
+            'https://example.com/watch?v=dQw4w9WgXcQ': None,
+            '': None,
+        }
+        for url, expected in cases.items():
+            self.assertEqual(parse_youtube_url(url), expected, url)
+
+
+class OutboxTests(HomeTestCase):
+
+    def test_sends_pending_mail(self):
+        queue_mail('Welcome', 'Hello', 'from@example.com', ['to@example.com'])
+        self.assertEqual(send_queued_mail(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OutgoingEmail.objects.get().status, 'sent')
+        self.assertEqual(send_queued_mail(), (0, 0))
+
+    def test_failure_backs_off_then_gives_up(self):
+        email = queue_mail('Welcome', 'Hello', 'from@example.com', ['to@example.com'])
+        with mock.patch('home.mail.EmailMessage.send', side_effect=OSError('down')):
+            self.assertEqual(send_queued_mail(max_attempts=2), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual((email.status, email.attempts), ('pending', 1))
+            self.assertGreater(email.next_attempt_at, email.created_at)
+            self.assertEqual(send_queued_mail(max_attempts=2), (0, 0))
+
+            OutgoingEmail.objects.update(next_attempt_at=email.created_at)
+            self.assertEqual(send_queued_mail(max_attempts=2), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('failed', 2, 'OSError: down'))
+
+
+class TagTests(HomeTestCase):
+
+    def test_name_differing_only_in_case_is_invalid(self):
+        Tag.objects.create(name='Python')
+        with self.assertRaisesMessage(ValidationError, "already exists"):
+            Tag(name=' python ').full_clean()
+        Tag.objects.get(name='Python').full_clean()
+
+    def test_admin_add_reports_duplicate(self):
+        Tag.objects.create(name='Python')
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:home_tag_add'), {'name': 'python'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "A tag with this name already exists.")
+        self.assertEqual(Tag.objects.count(), 1)
+
+
+class ServeFileTests(SimpleTestCase):
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.pdf')
+        os.write(handle, b'%PDF-1.4 0123456789')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def serve(self, **headers):
+        request = RequestFactory().get('/file.pdf', headers=headers)
+        return serve_file(request, self.path, 'file.pdf', 'application/pdf')
+
+    def test_if_modified_since_alone(self):
+        response = self.serve()
+        self.assertEqual(response.status_code, 200)
+        response = self.serve(if_modified_since=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_none_match(self):
+        response = self.serve()
+        self.assertEqual(self.serve(if_none_match=response['ETag']).status_code, 304)
+
+    def test_range(self):
+        response = self.serve(range='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content if response.streaming else [response.content]), b'%PDF')
+
+
+class ImporterTests(HomeTestCase):
+    HEADER = ('course_slug,course_title,course_description,category,level,tags,'
+              'lesson_title,lesson_description,lesson_type,video_url,pdf,order\n')
+
+    def run_csv(self, text):
+        errors = []
+        stats = CatalogImporter(log=errors.append).run(read_csv(io.StringIO(text)))
+        return stats, [e for e in errors if e.startswith('line')]
+
+    def test_csv_course_and_lessons(self):
+        stats, errors = self.run_csv(
+            self.HEADER
+            + 'py,Python,Basics,Programming,Beginner,Python;Web,Intro,,Video,https://youtu.be/dQw4w9WgXcQ,,1\n'
+            + 'py,Python,Basics,Programming,Beginner,Python;Web,Setup,,Video,,,2\n'
+        )
+        self.assertEqual(errors, [])
+        course = Course.objects.get(slug='py')
+        self.assertEqual(course.lesson_count, 2)
+        self.assertEqual(sorted(course.tags.values_list('slug', flat=True)), ['python', 'web'])
+        # A second run changes nothing.
+        stats, _ = self.run_csv(
+            self.HEADER
+            + 'py,Python,Basics,Programming,Beginner,Python;Web,Intro,,Video,https://youtu.be/dQw4w9WgXcQ,,1\n'
+            + 'py,Python,Basics,Programming,Beginner,Python;Web,Setup,,Video,,,2\n'
+        )
+        self.assertEqual((stats['courses_updated'], stats['lessons_updated'], stats['lessons_created']), (0, 0, 0))
+
+    def test_csv_course_row_without_lesson_columns(self):
+        stats, errors = self.run_csv(self.HEADER + 'go,Go,Services,Programming,Beginner,Go\n')
+        self.assertEqual(errors, [])
+        self.assertEqual(stats['courses_created'], 1)
+        self.assertEqual(Course.objects.get(slug='go').lesson_count, 0)
+
+    def test_csv_header_without_lesson_columns(self):
+        stats, errors = self.run_csv('course_slug,course_title,course_description,category,level,tags\n'
+                                     'go,Go,Services,Programming,Beginner,\n')
+        self.assertEqual((stats['courses_created'], errors), (1, []))
+
+    def test_csv_missing_course_columns(self):
+        with self.assertRaisesMessage(CatalogError, "course_slug"):
+            self.run_csv('slug,course_title,course_description,category,level,tags\n')
+        with self.assertRaisesMessage(CatalogError, "course_slug"):
+            self.run_csv('')
+
+    def test_csv_bad_row_fails_its_course(self):
+        stats, errors = self.run_csv(
+            self.HEADER
+            + 'py,Python,Basics,Programming,Beginner,,Intro,,Video,,,1,extra\n'
+            + 'py,Python,Basics,Programming,Beginner,,Setup,,Video,,,2\n'
+            + 'go,Go,Services,Programming,Beginner,,Intro,,Video,,,1\n'
+        )
+        self.assertEqual(errors, ["line 2: more fields than the header"])
+        self.assertEqual(list(Course.objects.values_list('slug', flat=True)), ['go'])
+
+    def test_jsonl_validation(self):
+        lines = [
+            '{"slug": "py", "title": "Python", "category": "Programming", "level": "Beginner", "tags": "Python"}',
+            '{"slug": "go", "title": "Go", "category": "Programming", "level": "Expert"}',
+            '{"slug": "js", "title": "JS", "category": "Programming", "level": "Beginner", '
+            '"lessons": [{"title": "A", "lesson_type": "Video", "order": 1}, '
+            '{"title": "B", "lesson_type": "Video", "order": 1}]}',
+            'not json',
+        ]
+        errors = []
+        stats = CatalogImporter(log=errors.append).run(read_jsonl(io.StringIO('\n'.join(lines))))
+        self.assertEqual(stats['errors'], 4)
+        self.assertEqual(stats['courses_created'], 0)
+        self.assertIn("line 1: tags must be a list of strings", errors)
+
+    def test_command_reports_bad_header(self):
+        handle, path = tempfile.mkstemp(suffix='.csv')
+        os.write(handle, b'title\nPython\n')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        with self.assertRaisesMessage(CommandError, "CSV header is missing"):
+            call_command('import_catalog', path, stdout=io.StringIO())
+
+
+class EnrollCohortTests(HomeTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = [
+            Course.objects.create(title=f'Course {i}', description='-', category='-', level='Beginner')
+            for i in range(3)
+        ]
+        cls.students = [
+            Student.objects.create(user=User.objects.create_user(name, f'{name}@example.com', 'pw'))
+            for name in ['erin', 'frank']
+        ]
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def post(self, data):
+        return self.client.post(reverse('enroll_cohort'), json.dumps(data), content_type='application/json')
+
+    def test_enrolls_and_counts(self):
+        Enrollment.objects.create(student=self.students[0], course=self.courses[0])
+        response = self.post({'courses': [self.courses[0].pk, self.courses[1].pk],
+                              'students': [self.students[0].pk], 'usernames': ['frank', 'nobody']})
+        self.assertEqual(response.json(), {
+            'created': 3, 'skipped': 1, 'unknown_students': [], 'unknown_usernames': ['nobody'],
+        })
+        self.assertEqual(Enrollment.objects.count(), 4)
+
+    def test_strings_are_not_lists(self):
+        for data in [
+            {'courses': str(self.courses[1].pk) * 2, 'students': [self.students[0].pk]},
+            {'courses': [self.courses[0].pk], 'usernames': 'erin'},
+            {'courses': [self.courses[0].pk], 'students': self.students[0].pk},
+        ]:
+            self.assertEqual(self.post(data).status_code, 400, data)
+        self.assertFalse(Enrollment.objects.exists())
@@ -1,7 +1,8 @@
+import os
 from django.urls import path
 from django.conf.urls.static import static
 from django.conf import settings
-from . import views
+from . import api, views
 from django.contrib import admin
 from django.urls import path
 from django.contrib.auth.views import LogoutView
@@ -24,11 +25,31 @@ urlpatterns = [
     path('course/<int:course_id>/', views.course_detail, name='course_detail'),
     path('course/<int:course_id>/lessons/', views.lesson_list, name='lesson_list'),
     path("course/<int:course_id>/lesson/<int:lesson_id>/", views.lesson_detail, name="lesson_detail"),
+    path('course/<int:course_id>/lesson/<int:lesson_id>/pdf/', views.lesson_pdf, name='lesson_pdf'),
     path('course/<int:course_id>/lesson/<int:lesson_id>/complete/', views.complete_lesson, name='complete_lesson'),
+    path('course/<int:course_id>/lessons/complete/', views.complete_lessons, name='complete_lessons'),
+
+    path(settings.MEDIA_URL.lstrip('/') + 'thumbs/<path:name>', views.thumbnail, name='thumbnail'),
+
+    path('search/lessons/', views.lesson_search, name='lesson_search'),
+
+    path('metrics/', views.metrics, name='metrics'),
+
+    path('api/courses/', api.courses, name='api_courses'),
+    path('api/courses/<int:course_id>/', api.course, name='api_course'),
+    path('api/enrollments/', api.enrollments, name='api_enrollments'),
+    path('api/progress/', api.progress, name='api_progress'),
 
     path('enrollments/', views.enrollments_page, name='enrollments_page'),
+    path('enrollments/courses.json', views.course_catalog_json, name='course_catalog_json'),
+    path('enrollments/cohort/', views.enroll_cohort, name='enroll_cohort'),
+    path('enrollments/report/', views.progress_report, name='progress_report'),
     path('enroll_course/<int:course_id>/', views.enroll_course, name='enroll_course'),
     path("courses/<int:course_id>/unenroll/", views.unenroll_course, name="unenroll_course"),
 
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+# Only profile pictures are public media; lesson PDFs go through the
+# enrollment-checked lesson_pdf view.
+urlpatterns += static(settings.MEDIA_URL + 'profiles/', document_root=os.path.join(settings.MEDIA_ROOT, 'profiles'))
 
@@ -1,22 +1,42 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth import login as auth_login, logout
 from .forms import StudentSignupForm, StudentProfileUpdateForm
-from .models import Student, Enrollment, Course, Lesson
+from .models import Enrollment, Course, Lesson, LessonPage, Student, as_list
 from django.contrib.auth.models import User
 from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.auth.decorators import login_required
-from .filters import CourseFilter
-from django.core.paginator import Paginator
-from django.core.mail import send_mail
+from django.contrib.admin.views.decorators import staff_member_required
+from .decorators import conditional_page, student_required
+from .etags import enrollments_page_etag, lesson_detail_etag, lesson_list_etag
+from .filters import CourseFilter, catalog_page, enrollments_catalog
+from .outline import get_outline
+from .recommend import recommended_courses
+from .cards import attach_cards
+from .sendfile import serve_file
+from .images import THUMBNAIL_DIR
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+from .mail import queue_mail
+from .reports import csv_lines, jsonl_lines, progress_rows
+from .metrics import query_budget, registry
+from django.db import transaction
 from django.contrib.sites.shortcuts import get_current_site
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.template.loader import render_to_string
 from django.utils.encoding import force_str  
-from django.http import Http404
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
+from asgiref.sync import sync_to_async
+import asyncio
+import json
+import mimetypes
+import os
 
 
 
@@ -24,28 +44,11 @@ def student_signup(request):
     if request.method == 'POST':
         form = StudentSignupForm(request.POST, request.FILES)
         if form.is_valid():
-            user = form.save(commit=False)
-            user.is_active = False 
-            user.save()
-
-            current_site = get_current_site(request)
-            subject = "Verify your email for Skilloria "
-            uid = urlsafe_base64_encode(force_bytes(user.pk))
-            token = default_token_generator.make_token(user)
-            verification_link = f"http://{current_site.domain}/verify/{uid}/{token}/"
-            
-            message = render_to_string('email_verification.html', {
-                'user': user,
-                'verification_link': verification_link
-            })
-
-            send_mail(
-                subject,
-                message,
-                'no-reply@yourdomain.com',
-                [user.email],
-                fail_silently=False,
-            )
+            with transaction.atomic():
+                user = form.save(commit=False)
+                user.is_active = False 
+                user.save()
+                send_verification_email(request, user)
 
             messages.success(request, "Account created! Please check your email to verify your account.")
             return redirect('login')
@@ -56,6 +59,22 @@ def student_signup(request):
     return render(request, 'signup.html', {'form': form})
 
 
+def send_verification_email(request, user):
+    current_site = get_current_site(request)
+    subject = "Verify your email for Skilloria "
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    token = default_token_generator.make_token(user)
+    verification_link = f"http://{current_site.domain}/verify/{uid}/{token}/"
+    
+    message = render_to_string('email_verification.html', {
+        'user': user,
+        'verification_link': verification_link
+    })
+
+    # Delivered by the send_queued_mail worker, not on the request path.
+    queue_mail(subject, message, 'no-reply@yourdomain.com', [user.email])
+
+
 def verify_email(request, uidb64, token):
     try:
         uid = force_str(urlsafe_base64_decode(uidb64))
@@ -100,13 +119,10 @@ def student_logout(request):
     return redirect('index')
 
 
-@login_required
+@query_budget(4)
+@student_required
 def user_detail(request, pk):
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
-        messages.error(request, "Student not found")
-        return redirect('enrollment')
+    student = request.student
     
     if request.user != student.user:
         messages.error(request, "You are not allowed to edit this profile.")
@@ -144,55 +160,52 @@ def index(request):
     return render(request, 'index.html')
 
 
-@login_required
-def user_dashboard(request):
-    try:
-        student = request.user.student
-    except Student.DoesNotExist:
-        messages.error(request, "Your student profile is missing. Please contact admin.")
-        return redirect('index')
-    
-    enrollments = Enrollment.objects.filter(student=student).select_related('course')
-    completed_courses = 0
+@query_budget(10)
+@student_required
+async def user_dashboard(request):
+    student = await request.astudent()
 
-    for e in enrollments:
-        total = e.course.lessons.count()
-        completed = e.completed_lessons.count()
-        e.progress_percent = int((completed / total) * 100) if total else 0
-        if e.progress_percent == 100:
-            completed_courses += 1
+    enrollments = [
+        enrollment async for enrollment in
+        Enrollment.objects.filter(student=student).select_related('course').with_progress()
+    ]
+    completed_courses = sum(1 for e in enrollments if e.progress_percent == 100)
 
     pending_courses = len(enrollments) - completed_courses
-    all_courses = Course.objects.all()
-    enrolled_courses_ids = enrollments.values_list('course_id', flat=True)
+    recommended = await sync_to_async(recommended_courses)([e.course_id for e in enrollments])
+    await sync_to_async(attach_cards)([e.course for e in enrollments] + recommended, words=20)
 
-    return render(request, 'dashboard.html', {
+    return await sync_to_async(render)(request, 'dashboard.html', {
         'student': student,
         'enrollments': enrollments,
-        'all_courses': all_courses,
-        'enrolled_courses_ids': enrolled_courses_ids,
+        'recommended_courses': recommended,
         'completed_courses': completed_courses,
         'pending_courses': pending_courses,
     })
 
 
-@login_required
-def enrollments_page(request):
-    student = Student.objects.filter(user=request.user).first()
-    if not student:
-        messages.error(request, "Student not found")
-        return redirect('enrollment')
-    all_courses_qs = Course.objects.all()
+def catalog_cards(request):
+    course_filter, page_obj = enrollments_catalog(request)
+    attach_cards(page_obj, words=25)
+    return course_filter, page_obj
+
 
-    course_filter = CourseFilter(request.GET, queryset=all_courses_qs)
-    filtered_courses = course_filter.qs
+@query_budget(9)
+@student_required
+@conditional_page(enrollments_page_etag)
+async def enrollments_page(request):
+    student = await request.astudent()
 
-    paginator = Paginator(filtered_courses, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    async def enrolled_ids():
+        return {
+            course_id async for course_id in
+            Enrollment.objects.filter(student=student).values_list('course_id', flat=True)
+        }
 
-    enrollments = Enrollment.objects.filter(student=student)
-    enrolled_courses_ids = enrollments.values_list('course_id', flat=True)
+    (course_filter, page_obj), enrolled_courses_ids = await asyncio.gather(
+        sync_to_async(catalog_cards)(request),
+        enrolled_ids(),
+    )
 
     context = {
         'student': student,
@@ -201,34 +214,46 @@ def enrollments_page(request):
         'page_obj': page_obj,
         'enrolled_courses_ids': enrolled_courses_ids,
     }
-    return render(request, 'enrollment.html', context)
+    return await sync_to_async(render)(request, 'enrollment.html', context)
 
 
+@query_budget(5)
 @login_required
+def course_catalog_json(request):
+    course_filter = CourseFilter(request.GET, queryset=Course.objects.all())
+    try:
+        per_page = min(max(int(request.GET.get('per_page', 20)), 1), 100)
+    except ValueError:
+        per_page = 20
+    fields = ['id', 'title', 'category', 'level']
+    page_obj = catalog_page(course_filter, request.GET.get('cursor'), per_page, fields)
+    return JsonResponse({
+        'results': [{field: row[field] for field in fields} for row in page_obj],
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    })
+
+
+@student_required
 def enroll_course(request, course_id):
-    student = Student.objects.filter(user=request.user).first()
-    if not student:
-        messages.error(request, "Student not Found")
-        return redirect('enrollment')
-    
+    student = request.student
+
     try:
         course = Course.objects.get(id=course_id)
     except Course.DoesNotExist:
         raise Http404("Course not found")
     
-    enrollment = Enrollment.objects.filter(student=student, course=course).first()
-    
-    if enrollment:
-        messages.info(request, f"You are already enrolled in '{course.title}'.")
-    else:
-        Enrollment.objects.create(student=student, course=course)
+    created, _ = Enrollment.objects.enroll([student.pk], [course.pk])
+    if created:
         messages.success(request, f"You have successfully enrolled in '{course.title}'!")
+    else:
+        messages.info(request, f"You are already enrolled in '{course.title}'.")
 
     return redirect('enrollments_page')
     
 
 
-@login_required
+@student_required
 def unenroll_course(request, course_id):
     if request.method == "POST" and request.user.is_authenticated:
         course = Course.objects.filter(id=course_id).first()
@@ -236,113 +261,259 @@ def unenroll_course(request, course_id):
             messages.error(request, "Course not found")
             return redirect('lesson_list')
         
-        Enrollment.objects.filter(student=request.user.student, course=course).delete()
+        Enrollment.objects.filter(student=request.student, course=course).delete()
     return redirect("enrollments_page") 
 
 
 
-@login_required
+@query_budget(6)
+@student_required
 def course(request):
-    student = request.user.student
-    enrollments = Enrollment.objects.filter(student=student).select_related('course')
-
-    for e in enrollments:
-        total_lessons = e.course.lessons.count()
-        completed = e.completed_lessons.count()
-        e.progress_percent = int((completed / total_lessons) * 100) if total_lessons else 0
+    student = request.student
+    enrollments = (
+        Enrollment.objects.filter(student=student)
+        .select_related('course').with_progress()
+    )
+    attach_cards((e.course for e in enrollments), chars=100)
 
     return render(request, 'course.html', {"enrollments": enrollments})
 
 
-@login_required
+@query_budget(8)
+@student_required
 def course_detail(request, course_id):
-    course = Course.objects.filter(id=course_id).first()
-    if not course:
-        messages.error(request, "Course not found")
-        return redirect('lesson_list')
-    
-    lessons = course.lessons.all().order_by('order')
-    student = request.user.student
-
-    enrollment = Enrollment.objects.filter(student=student, course=course).first()
+    enrollment = Enrollment.objects.filter(
+        student=request.student, course_id=course_id,
+    ).select_related('course').first()
     if not enrollment:
+        if not Course.objects.filter(id=course_id).exists():
+            messages.error(request, "Course not found")
+            return redirect('course')
         messages.error(request, "Enrollment not found")
-        return redirect('lesson_details')
-    completed_lessons = enrollment.completed_lessons.all()
+        return redirect('enrollments_page')
 
+    course = enrollment.course
     return render(request, 'lesson_list.html', {
         'course': course,
-        'lessons': lessons,
-        'completed_lessons': completed_lessons,
+        'lessons': get_outline(course),
+        'completed_lesson_ids': enrollment.completed_lesson_ids(),
     })
 
 
+@query_budget(7)
 @login_required
+@conditional_page(lesson_list_etag)
 def lesson_list(request, course_id):
     course = Course.objects.filter(id=course_id).first()
     if not course:
         messages.error(request, "Courses not found")
-        return redirect('lesson_list')
-    lessons = course.lessons.all().order_by('order')
-    return render(request, 'lesson_list.html', {'course': course, 'lessons': lessons})
-
-
-@login_required
-def lesson_detail(request, course_id, lesson_id):
-    course = Course.objects.filter(id=course_id).first()
+        return redirect('course')
+    return render(request, 'lesson_list.html', {'course': course, 'lessons': get_outline(course)})
+
+
+@query_budget(10)
+@student_required
+@conditional_page(lesson_detail_etag)
+async def lesson_detail(request, course_id, lesson_id):
+    # The three lookups only need the ids from the URL, so they are sent
+    # together; the error order below is the same as checking one by one.
+    student = await request.astudent()
+    course, lesson, enrollment = await asyncio.gather(
+        Course.objects.filter(id=course_id).afirst(),
+        Lesson.objects.filter(id=lesson_id, course_id=course_id).afirst(),
+        Enrollment.objects.filter(student=student, course_id=course_id).afirst(),
+    )
     if not course:
         messages.error(request, "Course not found")
-        return redirect('lesson_list')
+        return redirect('course')
     
-    lesson = Lesson.objects.filter(id=lesson_id, course=course).first()
     if not lesson:
         messages.error(request, "Lesson not found")
-        return redirect('lesson_detail')
+        return redirect('lesson_list', course_id=course.id)
 
-    enrollment = Enrollment.objects.filter(student=request.user.student, course=course).first()
     if not enrollment:
         messages.error(request, "Enrollment not found")
-        return redirect('lesson_details')
+        return redirect('enrollments_page')
     
-    completed_lessons = enrollment.completed_lessons.all()
-
-    lessons = list(course.lessons.order_by('order'))
-    current_index = lessons.index(lesson)
-    prev_lesson = lessons[current_index - 1] if current_index > 0 else None
-    next_lesson = lessons[current_index + 1] if current_index < len(lessons) - 1 else None
+    outline, completed_lesson_ids = await asyncio.gather(
+        sync_to_async(get_outline)(course),
+        enrollment.acompleted_lesson_ids(),
+    )
+    prev_lesson, next_lesson = outline.neighbours(lesson.id)
 
-    return render(request, 'lesson_detail.html', {
+    return await sync_to_async(render)(request, 'lesson_detail.html', {
         'course': course,
         'lesson': lesson,
-        'completed_lessons': completed_lessons,
+        'completed_lesson_ids': completed_lesson_ids,
         'prev_lesson': prev_lesson,
         'next_lesson': next_lesson,
     })
 
 
-@login_required
+@student_required
+def lesson_pdf(request, course_id, lesson_id):
+    lesson = Lesson.objects.filter(id=lesson_id, course_id=course_id).only('pdf').first()
+    if not lesson or not lesson.pdf:
+        raise Http404("PDF not found")
+    if not Enrollment.objects.filter(student=request.student, course_id=course_id).exists():
+        raise Http404("PDF not found")
+    try:
+        return serve_file(
+            request, lesson.pdf.path, lesson.pdf.name, 'application/pdf',
+            filename=os.path.basename(lesson.pdf.name),
+        )
+    except FileNotFoundError:
+        raise Http404("PDF not found")
+
+
+def thumbnail(request, name):
+    # Thumbnail names embed a content hash, so they never change and can
+    # be cached by browsers and proxies for a year.
+    try:
+        path = safe_join(settings.MEDIA_ROOT, THUMBNAIL_DIR, name)
+        response = serve_file(request, path, f'{THUMBNAIL_DIR}/{name}', mimetypes.guess_type(path)[0])
+    except (FileNotFoundError, SuspiciousFileOperation):
+        raise Http404("Thumbnail not found")
+    response['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+@query_budget(5)
+@student_required
+def lesson_search(request):
+    # Full-text search inside the PDFs of the student's enrolled courses.
+    query = request.GET.get('q', '')
+    hits = (
+        LessonPage.objects.filter(lesson__course__enrollments__student=request.student)
+        .search(query)
+        .values('lesson_id', 'lesson__title', 'lesson__course_id', 'lesson__course__title', 'page_number')[:200]
+    )
+    results = {}
+    for hit in hits:
+        result = results.get(hit['lesson_id'])
+        if result is None:
+            result = results[hit['lesson_id']] = {
+                'lesson_id': hit['lesson_id'],
+                'lesson_title': hit['lesson__title'],
+                'course_id': hit['lesson__course_id'],
+                'course_title': hit['lesson__course__title'],
+                'url': reverse('lesson_detail', args=[hit['lesson__course_id'], hit['lesson_id']]),
+                'pages': [],
+            }
+        result['pages'].append(hit['page_number'])
+    return JsonResponse({'query': query, 'results': list(results.values())})
+
+
+@query_budget(15)
+@student_required
 def complete_lesson(request, course_id, lesson_id): 
     if request.method == "POST":
         enrollment = Enrollment.objects.filter(
-            student=request.user.student, course_id=course_id
+            student=request.student, course_id=course_id
         ).first()
         if not enrollment:
             messages.error(request, "Enrollment not found")
-            return redirect('lesson_list')
-        
-        lesson = Lesson.objects.filter(id=lesson_id, course_id=course_id).first()
+            return redirect('lesson_list', course_id=course_id)
+
+        lesson = Lesson.objects.filter(id=lesson_id, course_id=course_id).only('title').first()
         if not lesson:
             messages.error(request, "Lesson not found")
-            return redirect('lesson_detil', course_id=course_id)
-
-        if lesson not in enrollment.completed_lessons.all():
-            enrollment.completed_lessons.add(lesson)
-            total = enrollment.course.lessons.count()
-            done = enrollment.completed_lessons.count()
-            enrollment.progress = int((done / total) * 100)
-            enrollment.save()
+            return redirect('lesson_list', course_id=course_id)
+
+        _, added = enrollment.complete_lessons([lesson.id])
+        if added:
             messages.success(request, f"Lesson '{lesson.title}' marked as complete!")
         else:
             messages.info(request, f"Lesson '{lesson.title}' is already completed.")
 
-        return redirect("course_detail", course_id=course_id)
+    return redirect("course_detail", course_id=course_id)
+
+
+@query_budget(12)
+@login_required
+@require_POST
+def complete_lessons(request, course_id):
+    if not request.student:
+        return JsonResponse({'error': "Student not found"}, status=404)
+    enrollment = Enrollment.objects.filter(
+        student=request.student, course_id=course_id
+    ).select_related('course').first()
+    if not enrollment:
+        return JsonResponse({'error': "Enrollment not found"}, status=404)
+
+    if request.content_type == 'application/json':
+        try:
+            lesson_ids = json.loads(request.body).get('lesson_ids', [])
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': "Invalid JSON body"}, status=400)
+    else:
+        lesson_ids = request.POST.getlist('lesson_ids')
+    try:
+        lesson_ids = [int(pk) for pk in as_list(lesson_ids)]
+    except (TypeError, ValueError):
+        return JsonResponse({'error': "lesson_ids must be a list of integers"}, status=400)
+
+    accepted, _ = enrollment.complete_lessons(lesson_ids)
+    return JsonResponse({
+        'course_id': enrollment.course_id,
+        'accepted': accepted,
+        'rejected': sorted(set(lesson_ids) - set(accepted)),
+        'completed_count': enrollment.completed_count,
+        'lesson_count': enrollment.course.lesson_count,
+        'progress': enrollment.progress,
+    })
+
+
+@staff_member_required
+@require_POST
+def enroll_cohort(request):
+    # Body: {"courses": [ids], "students": [ids]} or "usernames": [...].
+    try:
+        data = json.loads(request.body)
+        course_ids = {int(pk) for pk in as_list(data.get('courses', []))}
+        student_ids = {int(pk) for pk in as_list(data.get('students', []))}
+        usernames = {str(name) for name in as_list(data.get('usernames', []))}
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'error': "Expected JSON with an integer 'courses' list and a 'students' or 'usernames' list"}, status=400)
+    if not course_ids or not (student_ids or usernames):
+        return JsonResponse({'error': "Both courses and students are required"}, status=400)
+
+    found_courses = set(Course.objects.filter(pk__in=course_ids).values_list('pk', flat=True))
+    if course_ids - found_courses:
+        return JsonResponse({'error': "Unknown courses", 'courses': sorted(course_ids - found_courses)}, status=404)
+
+    found = set(Student.objects.filter(pk__in=student_ids).values_list('pk', flat=True))
+    by_name = dict(Student.objects.filter(user__username__in=usernames).values_list('user__username', 'pk'))
+    created, skipped = Enrollment.objects.enroll(found | set(by_name.values()), found_courses)
+    return JsonResponse({
+        'created': created,
+        'skipped': skipped,
+        'unknown_students': sorted(student_ids - found),
+        'unknown_usernames': sorted(usernames - set(by_name)),
+    })
+
+
+@staff_member_required
+def progress_report(request):
+    enrollments = Enrollment.objects.all()
+    course_ids = request.GET.getlist('course')
+    if course_ids:
+        try:
+            enrollments = enrollments.filter(course_id__in=[int(pk) for pk in course_ids])
+        except ValueError:
+            return JsonResponse({'error': "course must be an integer"}, status=400)
+
+    rows = progress_rows(enrollments)
+    if request.GET.get('format') == 'jsonl':
+        response = StreamingHttpResponse(jsonl_lines(rows), content_type='application/x-ndjson')
+        filename = 'progress.jsonl'
+    else:
+        response = StreamingHttpResponse(csv_lines(rows), content_type='text/csv')
+        filename = 'progress.csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
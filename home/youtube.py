@@ -0,0 +1,51 @@
+import re
+from functools import lru_cache
+from urllib.parse import parse_qs, urlparse
+
+VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+PATH_ID_RE = re.compile(r'^/(?:embed|shorts|live|v|e)/([A-Za-z0-9_-]{11})(?:[/?]|$)')
+TIME_RE = re.compile(r'^(?:(\d+)h)?(?:(\d+)m)?(?:(\d+)s?)?$')
+YOUTUBE_HOSTS = {
+    'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+    'youtube-nocookie.com', 'www.youtube-nocookie.com',
+}
+
+
+def parse_start(value):
+    # Accepts "90", "90s", "1m30s" and "1h2m3s".
+    match = TIME_RE.match(value or '')
+    if not match or not any(match.groups()):
+        return 0
+    hours, minutes, seconds = (int(part or 0) for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+@lru_cache(maxsize=1024)
+def parse_youtube_url(url):
+    """
+    Return (video_id, start_seconds) for a YouTube URL, or None if it is
+    not one. Handles watch?v=, youtu.be/, /embed/, /shorts/, /live/ and
+    the t= / start= time offsets.
+    """
+    if not url:
+        return None
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    query = parse_qs(parsed.query)
+
+    video_id = None
+    if host == 'youtu.be':
+        video_id = parsed.path.lstrip('/').split('/')[0]
+    elif host in YOUTUBE_HOSTS:
+        if parsed.path in ('/watch', '/watch/'):
+            video_id = query.get('v', [''])[0]
+        else:
+            match = PATH_ID_RE.match(parsed.path)
+            video_id = match.group(1) if match else None
+    if not video_id or not VIDEO_ID_RE.match(video_id):
+        return None
+
+    start = query.get('t') or query.get('start') or ['']
+    if not start[0] and parsed.fragment.startswith('t='):
+        start = [parsed.fragment[2:]]
+    return video_id, parse_start(start[0])
@@ -18,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'widget_tweaks',
     'embed_video',
     'django_filters',
@@ -25,11 +26,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'home.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'home.middleware.StudentMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -38,7 +41,7 @@ ROOT_URLCONF = 'student_mgmt.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'home.metrics.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')], 
         'APP_DIRS': True,
         'OPTIONS': {
@@ -67,6 +70,24 @@ DATABASES = {
 }
 
 
+# Shared by every worker process and the management commands, so cached
+# outlines, cards and precomputed recommendations are seen everywhere.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379/1',
+    }
+}
+
+
+AUTHENTICATION_BACKENDS = [
+    'home.backends.StudentBackend',
+    # Sessions record the backend that logged them in; keeping ModelBackend
+    # listed lets sessions from before StudentBackend stay logged in.
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -97,6 +118,20 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Set to 'x-accel-redirect' (nginx) or 'x-sendfile' (Apache) to let the
+# web server stream protected files such as lesson PDFs.
+SENDFILE_MODE = None
+SENDFILE_URL_PREFIX = '/protected/'
+
+# Requests slower than this are logged by MetricsMiddleware. With
+# QUERY_BUDGET_STRICT on (set it in test settings), a view that runs more
+# queries than its @query_budget raises instead of just logging.
+SLOW_REQUEST_SECONDS = 0.5
+QUERY_BUDGET_STRICT = False
+
+# JSON instead of the HTML error page for /api/ requests.
+CSRF_FAILURE_VIEW = 'home.api.csrf_failure'
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 